@@ -19,7 +19,7 @@ export async function fetchCultureNearby(p: NearbyParams): Promise<any> {
   });
   if (p.from) qs.set('from', p.from);
   if (p.to) qs.set('to', p.to);
-  if (typeof p.rows === 'number') qs.set('rows', String(p.rows));
+  if (typeof p.rows === 'number') qs.set('limit', String(p.rows)); // 서버: 가까운 순 상위 limit개
 
   const ctrl = new AbortController();
   const to = setTimeout(() => ctrl.abort(), 7000);
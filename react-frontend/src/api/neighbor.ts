@@ -11,7 +11,9 @@ export type NeighborPost = {
   content_html: string;
 };
 
-export type NeighborPostSummary = Pick<NeighborPost, 'id' | 'author' | 'title' | 'date' | 'cover'>;
+export type NeighborPostSummary = Pick<NeighborPost, 'id' | 'author' | 'title' | 'date' | 'cover'> & {
+  cover_thumb?: string; // 카드용 작은 WebP (없으면 cover 사용)
+};
 
 export type NeighborComment = {
   id: number;
@@ -34,6 +36,8 @@ export type PostUpdateInput = Partial<PostCreateInput>;
 const EP = {
   neighborPosts: '/api/neighbor-posts',
   upload: '/api/uploads',
+  presign: '/api/uploads/presign',
+  confirm: '/api/uploads/confirm',
 };
 
 function resolvePostMedia(post: NeighborPost): NeighborPost {
@@ -50,9 +54,11 @@ function resolvePostMedia(post: NeighborPost): NeighborPost {
 
 function resolveSummaryMedia(post: NeighborPostSummary): NeighborPostSummary {
   const cover = post.cover ? apiUrl(post.cover) : undefined;
+  const cover_thumb = post.cover_thumb ? apiUrl(post.cover_thumb) : undefined;
   return {
     ...post,
     cover,
+    cover_thumb,
   };
 }
 
@@ -134,20 +140,65 @@ export function claimNeighborPost(id: string | number) {
   return apiFetch<void>(`${EP.neighborPosts}/${id}/claim`, { method: 'POST' });
 }
 
+function uploadHeaders(json = false): Headers {
+  const h = new Headers();
+  const token = typeof localStorage !== 'undefined' && localStorage.getItem('token');
+  if (token) h.set('Authorization', `Bearer ${token}`);
+  if (json) h.set('Content-Type', 'application/json');
+  return h;
+}
+
+type UploadSlot = {
+  upload: { method: 'POST' | 'PUT'; url: string; fields?: Record<string, string>; headers?: Record<string, string> };
+  token: string;
+};
+
+// 스토리지(s3/supabase)로 직접 업로드: 발급 → 업로드 → 확인.
+// 서버가 직접 업로드를 지원하지 않으면(local 저장소 등) null.
+async function uploadDirect(file: File): Promise<string | null> {
+  const presign = await fetch(apiUrl(EP.presign), {
+    method: 'POST',
+    credentials: 'include',
+    headers: uploadHeaders(true),
+    body: JSON.stringify({ content_type: file.type, size: file.size }),
+  });
+  if (!presign.ok) return null;
+  const slot = (await presign.json()) as UploadSlot;
+
+  let res: Response;
+  if (slot.upload.method === 'POST') {
+    const form = new FormData();
+    Object.entries(slot.upload.fields ?? {}).forEach(([k, v]) => form.append(k, v));
+    form.append('file', file); // 정책상 file은 마지막 필드여야 함
+    res = await fetch(slot.upload.url, { method: 'POST', body: form });
+  } else {
+    res = await fetch(slot.upload.url, { method: 'PUT', body: file, headers: slot.upload.headers });
+  }
+  if (!res.ok) throw new Error('upload failed');
+
+  const confirmed = await fetch(apiUrl(EP.confirm), {
+    method: 'POST',
+    credentials: 'include',
+    headers: uploadHeaders(true),
+    body: JSON.stringify({ token: slot.token }),
+  });
+  if (!confirmed.ok) throw new Error('upload failed');
+  const j = await confirmed.json(); // 공개 URL은 확인 후에만 발급
+  return j.url as string;
+}
+
 // 파일 업로드 → 업로드된 공개 URL 반환
 export async function uploadImage(file: File): Promise<string> {
+  const direct = await uploadDirect(file);
+  if (direct) return direct;
+
   const form = new FormData();
   form.append('file', file);
   const res = await fetch(apiUrl(EP.upload), {
     method: 'POST',
     body: form,
     credentials: 'include',
-    headers: (() => {
-      const h = new Headers();
-      const token = typeof localStorage !== 'undefined' && localStorage.getItem('token');
-      if (token) h.set('Authorization', `Bearer ${token}`);
-      return h;
-    })(),
+    headers: uploadHeaders(),
   });
   if (!res.ok) throw new Error('upload failed');
   const j = await res.json();
@@ -155,8 +206,23 @@ export async function uploadImage(file: File): Promise<string> {
 }
 
 // 댓글 API
-export function listComments(postId: number | string) {
-  return apiFetch<NeighborComment[]>(`${EP.neighborPosts}/${postId}/comments`);
+// 서버는 한 번에 최대 200개만 주고 다음 페이지 cursor는 X-Next-Cursor 헤더로 알려준다 → 끝까지 따라감
+export async function listComments(postId: number | string) {
+  const path = `${EP.neighborPosts}/${postId}/comments`;
+  const all: NeighborComment[] = [];
+  let cursor: string | null = null;
+  do {
+    const qs = new URLSearchParams({ limit: '200' });
+    if (cursor) qs.set('cursor', cursor);
+    const res = await fetch(apiUrl(`${path}?${qs.toString()}`), { credentials: 'omit' });
+    if (!res.ok) {
+      const text = await res.text().catch(() => '');
+      throw new Error(text || `HTTP ${res.status}`);
+    }
+    all.push(...((await res.json()) as NeighborComment[]));
+    cursor = res.headers.get('X-Next-Cursor');
+  } while (cursor);
+  return all;
 }
 export function createComment(postId: number | string, content: string) {
   return apiFetch<NeighborComment>(`${EP.neighborPosts}/${postId}/comments`, {
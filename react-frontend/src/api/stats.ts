@@ -61,13 +61,15 @@ export async function fetchCultureNearbyCount(p: {
     const data = await apiFetchPublic(apiUrl(`${ENDPOINTS.cultureNearby}?${qs.toString()}`), { signal: ctrl.signal }).catch(() => ({} as any));
 
     // 문화포털 응답 형태 보정
-    const items = (((data || {}).response || {}).body || {}).items || {};
+    const body = ((data || {}).response || {}).body || {};
+    const items = body.items || {};
     const arr = Array.isArray((items as any).item)
       ? (items as any).item
       : (items as any).item
       ? [(items as any).item]
       : [];
-    const count = arr.length;
+    // 목록은 limit개까지만 오므로 전체 개수는 totalCount
+    const count = Number(body.totalCount) || arr.length;
     clearTimeout(to);
     return count;
   } catch {
@@ -8,3 +8,11 @@ export async function fetchTourByKeyword(keyword: string, opts?: { rows?: number
   return apiFetch<any>(`/api/tour/search?${qs.toString()}`);
 }
 
+
+/** 여러 키워드(최대 10개)를 한 번에 검색 — 책 → 장소 흐름용. 키워드별 { items, totalCount }. */
+export async function fetchTourBatch(keywords: string[], opts?: { rows?: number }) {
+  const qs = new URLSearchParams({ keywords: keywords.join(','), numOfRows: String(opts?.rows ?? 5) });
+  return apiFetch<{ results: Record<string, { items: any[]; totalCount: number }>; failed: string[]; stale?: boolean }>(
+    `/api/tour/search/batch?${qs.toString()}`,
+  );
+}
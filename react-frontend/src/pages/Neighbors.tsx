@@ -125,7 +125,7 @@ export default function Neighbors() {
         <Grid>
           {posts.map((p) => (
             <Card key={p.id} to={`/neighbors/${p.id}`}>
-              {p.cover && <Thumb src={p.cover} alt={p.title} loading="lazy" decoding="async" />}
+              {p.cover && <Thumb src={p.cover_thumb || p.cover} alt={p.title} loading="lazy" decoding="async" />}
               <Body>
                 <CardTitle>{p.title}</CardTitle>
                 <CardMeta>
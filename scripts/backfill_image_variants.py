@@ -0,0 +1,112 @@
+"""Render thumb/medium WebP variants for uploads that predate them.
+
+New uploads get their variants right after they are stored; run this once for
+older post covers/images and trip proof photos, after changing the variant
+sizes (with --all), or to catch up uploads whose variant job was dropped.
+
+Usage:
+    python scripts/backfill_image_variants.py [--all] [--concurrency 2]
+
+Uses the same environment as the API server (DATABASE_URL / SQLITE_PATH,
+UPLOADS_STORAGE and its settings, IMAGE_*). Needs Pillow.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVER_ROOT = ROOT / "server"
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app import images, models  # type: ignore  # noqa: E402
+from app.database import SessionLocal  # type: ignore  # noqa: E402
+from app.routers import trips, uploads  # type: ignore  # noqa: E402
+from app.schema_upgrade import upgrade_schema  # type: ignore  # noqa: E402
+
+
+def _post_urls() -> set[str]:
+    urls: set[str] = set()
+    db = SessionLocal()
+    try:
+        rows = db.query(models.NeighborPost.cover, models.NeighborPost.images, models.NeighborPost.primary_image)
+        for cover, images_json, primary in rows:
+            urls.update(u for u in (cover, primary) if u)
+            try:
+                attached = json.loads(images_json) if images_json else []
+            except json.JSONDecodeError:
+                attached = []
+            if isinstance(attached, list):
+                urls.update(u for u in attached if isinstance(u, str) and u)
+    finally:
+        db.close()
+    return urls
+
+
+def _proof_urls() -> set[str]:
+    if not Path(trips.DB_PATH).exists():
+        return set()
+    conn = sqlite3.connect(trips.DB_PATH)
+    try:
+        return {u for (u,) in conn.execute("SELECT DISTINCT proof_url FROM trip_stops WHERE proof_url IS NOT NULL") if u}
+    finally:
+        conn.close()
+
+
+def _done_urls() -> set[str]:
+    db = SessionLocal()
+    try:
+        return {u for (u,) in db.query(models.ImageVariant.url)}
+    finally:
+        db.close()
+
+
+async def _run(filenames: list[str], concurrency: int) -> tuple[int, int]:
+    slots = asyncio.Semaphore(concurrency)
+    done = failed = 0
+
+    async def one(filename: str) -> None:
+        nonlocal done, failed
+        async with slots:
+            try:
+                await uploads.make_variants(filename)
+                done += 1
+            except Exception as exc:
+                failed += 1
+                print(f"WARN {filename}: {exc}")
+
+    try:
+        await asyncio.gather(*(one(f) for f in filenames))
+    finally:
+        images.shutdown()
+    return done, failed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill WebP variants of uploaded images")
+    parser.add_argument("--all", action="store_true", help="re-render images that already have variants")
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    if not images.enabled():
+        sys.exit("Pillow is not installed (or IMAGE_VARIANTS_ENABLED=0); nothing to do")
+
+    upgrade_schema()
+    urls = _post_urls() | _proof_urls()
+    if not args.all:
+        urls -= _done_urls()
+    filenames = sorted({name for name in map(uploads.filename_for, urls) if name})
+    print(f"Rendering variants for {len(filenames)} uploads")
+    done, failed = asyncio.run(_run(filenames, max(1, args.concurrency)))
+    print(f"Backfilled {done} uploads, {failed} failed")
+
+
+if __name__ == "__main__":
+    main()
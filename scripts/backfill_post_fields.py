@@ -0,0 +1,77 @@
+"""Fill the precomputed neighbor-post columns (excerpt, word_count, primary_image).
+
+New and edited posts get them at write time; run this once for rows that
+predate those columns, or after changing the derivation rules.
+
+Usage:
+    python scripts/backfill_post_fields.py [--all] [--batch 500]
+
+Uses DATABASE_URL / SQLITE_PATH like the API server, and the same cache
+settings (CACHE_BACKEND / CACHE_SQLITE_PATH): the feed version is bumped at the
+end so cached neighbor summaries stop serving the old excerpts.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+SERVER_ROOT = ROOT / "server"
+if str(SERVER_ROOT) not in sys.path:
+    sys.path.insert(0, str(SERVER_ROOT))
+
+from app import models  # type: ignore  # noqa: E402
+from app.content import derive_post_fields  # type: ignore  # noqa: E402
+from app.database import SessionLocal  # type: ignore  # noqa: E402
+from app.routers import posts as posts_router  # type: ignore  # noqa: E402
+from app.schema_upgrade import upgrade_schema  # type: ignore  # noqa: E402
+
+
+def _images(value: str | None) -> list[str] | None:
+    try:
+        data = json.loads(value) if value else None
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, list) else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill derived neighbor-post columns")
+    parser.add_argument("--all", action="store_true", help="recompute every row, not only missing ones")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    upgrade_schema()
+    db = SessionLocal()
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            q = db.query(models.NeighborPost).filter(models.NeighborPost.id > last_id)
+            if not args.all:
+                q = q.filter(models.NeighborPost.excerpt.is_(None))
+            posts = q.order_by(models.NeighborPost.id.asc()).limit(args.batch).all()
+            if not posts:
+                break
+            for post in posts:
+                fields = derive_post_fields(post.content_html, post.cover, _images(post.images))
+                for name, value in fields.items():
+                    setattr(post, name, value)
+                last_id = post.id
+                updated += 1
+            db.commit()
+    finally:
+        db.close()
+
+    if updated:
+        # summaries serve these columns from cache (ETag = feed version)
+        posts_router._bump_feed_version()
+    print(f"Backfilled {updated} neighbor posts")
+
+
+if __name__ == "__main__":
+    main()
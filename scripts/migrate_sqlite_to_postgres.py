@@ -24,7 +24,7 @@ SERVER_ROOT = ROOT / "server"
 if str(SERVER_ROOT) not in sys.path:
     sys.path.insert(0, str(SERVER_ROOT))
 
-from app import models  # type: ignore  # noqa: E402
+from app import counters, models  # type: ignore  # noqa: E402
 from app.database import Base  # type: ignore  # noqa: E402
 
 
@@ -80,6 +80,7 @@ def main() -> None:
     try:
         user_count = copy_rows(models.User, src_session, dest_session)
         post_count = copy_rows(models.NeighborPost, src_session, dest_session)
+        counters.recount(dest_session)
     finally:
         src_session.close()
         dest_session.close()
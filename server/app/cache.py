@@ -0,0 +1,824 @@
+"""Two-tier cache shared by the routers.
+
+Each worker keeps a small in-process L1 (``LRU``, bounded by entries and
+approximate bytes) in front of a shared L2 store, so gunicorn workers see
+the same entries, timestamps and ETags.
+
+Backends (``CACHE_BACKEND``):
+- ``sqlite`` (default): a local SQLite file in WAL mode, no external service.
+  Path via ``CACHE_SQLITE_PATH`` (defaults to ``server/.cache/``, owned by the
+  app; never a shared temp dir, since cached bodies are served verbatim).
+- ``memory``: L1 only, for single-process dev runs.
+
+Namespaces declare their own TTL, which ``CACHE_TTL_<NAME>`` can override.
+L1 caps default to ``CACHE_L1_ENTRIES`` / ``CACHE_L1_BYTES`` per namespace,
+overridable per namespace with ``CACHE_L1_ENTRIES_<NAME>`` / ``CACHE_L1_BYTES_<NAME>``.
+A namespace with a ``stale_ttl`` (``CACHE_STALE_TTL_<NAME>``) keeps entries
+that long past expiry, and ``Namespace.fetch`` serves them, marked stale,
+while its ``Upstream`` is failing (see there).
+
+``snapshot``/``restore`` carry live L1 entries across restarts through a
+SQLite file in the L2 format (``CACHE_SNAPSHOT_PATH``; empty disables).
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, Optional, Protocol
+
+import orjson
+
+
+@dataclass
+class Entry:
+    value: Any
+    stored_at: float
+
+
+@dataclass
+class CachedBody:
+    """A response body stored ready to send: JSON bytes, pre-compressed.
+
+    Bodies big enough to compress keep only their gzip/brotli variants, so
+    cache memory is counted in compressed bytes; ``identity`` is kept only
+    for small bodies (see conditional.cached_body).
+    """
+    etag: str
+    media_type: str
+    identity: Optional[bytes] = None
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(b) for b in (self.identity, self.gzip, self.br) if b)
+
+
+_VARIANTS = ("identity", "gzip", "br")
+
+
+def _encode(value: Any) -> bytes:
+    if isinstance(value, CachedBody):
+        parts = [getattr(value, v) or b"" for v in _VARIANTS]
+        header = orjson.dumps({"etag": value.etag, "media_type": value.media_type, "sizes": [len(p) for p in parts]})
+        return b"B" + header + b"\n" + b"".join(parts)
+    return b"J" + orjson.dumps(value)
+
+
+def _decode(blob: bytes) -> Any:
+    kind, data = blob[:1], blob[1:]
+    if kind == b"B":
+        header_raw, _, payload = data.partition(b"\n")
+        header = orjson.loads(header_raw)
+        body = CachedBody(etag=header["etag"], media_type=header["media_type"])
+        offset = 0
+        for name, size in zip(_VARIANTS, header["sizes"]):
+            if size:
+                setattr(body, name, payload[offset:offset + size])
+            offset += size
+        return body
+    if kind == b"J":
+        return orjson.loads(data)
+    return orjson.loads(blob)  # rows written before the type prefix existed
+
+
+def approx_size(value: Any) -> int:
+    """Rough in-memory weight of a cached value: its encoded size."""
+    if isinstance(value, CachedBody):
+        return value.nbytes
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    try:
+        return len(orjson.dumps(value))
+    except TypeError:
+        return 64  # opaque objects (e.g. frozen dataclasses): nominal weight
+
+
+class LRU:
+    """Thread-safe LRU with a deadline per entry and caps on entry count and
+    approximate bytes (``sizeof``; 0 disables the byte cap).
+
+    Expired entries are dropped when read and by a sweep that runs on writes
+    at most every ``sweep_every`` seconds.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: int = 0,
+        sizeof: Callable[[Any], int] = approx_size,
+        sweep_every: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.sweep_every = sweep_every
+        # key -> (deadline, size, value)
+        self._data: "OrderedDict[Hashable, tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, now: Optional[float] = None) -> Any:
+        now = time.time() if now is None else now
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            if item[0] <= now:
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[2]
+
+    def peek(self, key: Hashable, now: Optional[float] = None) -> Any:
+        """Like ``get`` without touching recency or counters."""
+        now = time.time() if now is None else now
+        with self._lock:
+            item = self._data.get(key)
+        return item[2] if item is not None and item[0] > now else None
+
+    def set(self, key: Hashable, value: Any, deadline: float, now: Optional[float] = None) -> None:
+        size = self.sizeof(value) + (len(key) if isinstance(key, str) else 0)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (deadline, size, value)
+            self.nbytes += size
+            while len(self._data) > self.max_entries or (self.max_bytes and self.nbytes > self.max_bytes and len(self._data) > 1):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+        now = time.time() if now is None else now
+        if now - self._last_sweep >= self.sweep_every:
+            self.sweep(now)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop every expired entry; returns how many."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_sweep = now
+            expired = [k for k, (deadline, _, _) in self._data.items() if deadline <= now]
+            for key in expired:
+                self._drop(key)
+            self.expirations += len(expired)
+        return len(expired)
+
+    def items(self) -> list[tuple[Hashable, Any]]:
+        with self._lock:
+            return [(k, v) for k, (_, _, v) in self._data.items()]
+
+    def _drop(self, key: Hashable) -> None:
+        # caller holds the lock
+        _, size, _ = self._data.pop(key)
+        self.nbytes -= size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.nbytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str, now: float) -> Optional[Entry]: ...
+    def set(self, key: str, entry: Entry, ttl: float) -> None: ...
+    def delete_prefix(self, prefix: str) -> None: ...
+    def counter(self, name: str) -> int: ...
+    def incr(self, name: str) -> int: ...
+
+
+def _counter_seed() -> int:
+    # counters start from wall-clock seconds so a wiped store never hands out
+    # a version that a client may still hold in an ETag
+    return int(time.time())
+
+
+class MemoryBackend:
+    """No shared tier: entries live only in each process' L1."""
+
+    def __init__(self) -> None:
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Optional[Entry]:
+        return None
+
+    def set(self, key: str, entry: Entry, ttl: float) -> None:
+        pass
+
+    def delete_prefix(self, prefix: str) -> None:
+        pass
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.setdefault(name, _counter_seed())
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            value = self._counters.get(name, _counter_seed()) + 1
+            self._counters[name] = value
+            return value
+
+
+class SQLiteBackend:
+    """Shared L2 in a local SQLite file; safe across processes on one host."""
+
+    _PURGE_EVERY = 200  # sets between expired-row sweeps
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " stored_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_counters ("
+            " name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=2.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, now: float) -> Optional[Entry]:
+        row = self._conn().execute(
+            "SELECT value, stored_at FROM cache_entries WHERE key=? AND expires_at>?",
+            (key, now),
+        ).fetchone()
+        if not row:
+            return None
+        return Entry(_decode(row[0]), row[1])
+
+    def set(self, key: str, entry: Entry, ttl: float) -> None:
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries(key, value, stored_at, expires_at) VALUES(?,?,?,?)",
+            (key, _encode(entry.value), entry.stored_at, entry.stored_at + ttl),
+        )
+        self._sets += 1
+        if self._sets % self._PURGE_EVERY == 0:
+            self.purge(time.time())
+
+    def purge(self, now: float) -> None:
+        self._conn().execute("DELETE FROM cache_entries WHERE expires_at<=?", (now,))
+
+    def items(self, now: float) -> list[tuple[str, Entry]]:
+        rows = self._conn().execute(
+            "SELECT key, value, stored_at FROM cache_entries WHERE expires_at>?", (now,)
+        ).fetchall()
+        return [(key, Entry(_decode(value), stored_at)) for key, value, stored_at in rows]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def delete_prefix(self, prefix: str) -> None:
+        self._conn().execute(
+            "DELETE FROM cache_entries WHERE substr(key, 1, ?)=?", (len(prefix), prefix)
+        )
+
+    def counter(self, name: str) -> int:
+        conn = self._conn()
+        row = conn.execute("SELECT value FROM cache_counters WHERE name=?", (name,)).fetchone()
+        if row:
+            return int(row[0])
+        conn.execute(
+            "INSERT OR IGNORE INTO cache_counters(name, value) VALUES(?,?)",
+            (name, _counter_seed()),
+        )
+        row = conn.execute("SELECT value FROM cache_counters WHERE name=?", (name,)).fetchone()
+        return int(row[0])
+
+    def incr(self, name: str) -> int:
+        row = self._conn().execute(
+            "INSERT INTO cache_counters(name, value) VALUES(?,?) "
+            "ON CONFLICT(name) DO UPDATE SET value=value+1 RETURNING value",
+            (name, _counter_seed()),
+        ).fetchone()
+        return int(row[0])
+
+
+# stand-in version counters when the shared store fails (seeded from the
+# clock like every counter, so they stay ahead of versions already handed out)
+_local_counters = MemoryBackend()
+
+
+# app-owned directory for the L2 file and the snapshot (server/.cache)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+
+def _make_backend() -> CacheBackend:
+    kind = (os.getenv("CACHE_BACKEND", "sqlite") or "sqlite").strip().lower()
+    if kind == "memory":
+        return MemoryBackend()
+    path = os.getenv("CACHE_SQLITE_PATH")
+    if not path:
+        os.makedirs(CACHE_DIR, mode=0o700, exist_ok=True)
+        path = os.path.join(CACHE_DIR, "cache.sqlite3")
+    try:
+        return SQLiteBackend(path)
+    except sqlite3.Error as exc:
+        print("WARN cache: falling back to memory backend:", exc)
+        return MemoryBackend()
+
+
+backend: CacheBackend = _make_backend()
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# per-namespace L1 caps (each worker)
+L1_MAX_ENTRIES = _env_int("CACHE_L1_ENTRIES", 1000)
+L1_MAX_BYTES = _env_int("CACHE_L1_BYTES", 8 * 1024 * 1024)
+
+
+class Upstream:
+    """Failure memory for one upstream provider, shared through L2.
+
+    After a failure the provider is *down* for ``fail_ttl`` seconds: callers
+    skip it and answer from stale cache (or nothing) instead of waiting on
+    another timeout. Until a call succeeds again it stays *suspect*, and
+    ``Namespace.fetch`` refreshes stale entries in the background rather than
+    holding a request on it.
+    """
+
+    _SUSPECT_FOR = 3600.0  # forget a failure nobody retried after this long
+
+    def __init__(self, name: str, fail_ttl: float) -> None:
+        self.name = name
+        env_ttl = os.getenv(f"UPSTREAM_FAIL_TTL_{name.upper()}")
+        self.fail_ttl = float(env_ttl) if env_ttl else fail_ttl
+        self._failed_at: Optional[float] = None  # this worker's view; L2 has the shared one
+        self.failures = 0
+        self.skipped = 0
+
+    def _key(self) -> str:
+        return f"__upstream__:{self.name}"
+
+    def last_failure(self, now: Optional[float] = None) -> Optional[float]:
+        now = time.time() if now is None else now
+        failed_at = self._failed_at
+        try:
+            entry = backend.get(self._key(), now)
+        except sqlite3.Error:
+            entry = None
+        if entry is not None:
+            failed_at = max(failed_at or 0.0, float(entry.value))
+        if failed_at is not None and now - failed_at >= self._SUSPECT_FOR:
+            return None
+        return failed_at
+
+    def down(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        failed_at = self.last_failure(now)
+        return failed_at is not None and now - failed_at < self.fail_ttl
+
+    def suspect(self, now: Optional[float] = None) -> bool:
+        return self.last_failure(now) is not None
+
+    def failed(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self._failed_at = now
+        self.failures += 1
+        try:
+            backend.set(self._key(), Entry(now, now), self._SUSPECT_FOR)
+        except sqlite3.Error:
+            pass
+
+    def ok(self) -> None:
+        if self._failed_at is None and not self.suspect():
+            return
+        self._failed_at = None
+        try:
+            backend.delete_prefix(self._key())
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> dict:
+        failed_at = self.last_failure()
+        return {
+            "fail_ttl": self.fail_ttl,
+            "down": self.down(),
+            "last_failure": failed_at,
+            "failures": self.failures,
+            "skipped": self.skipped,
+        }
+
+
+_upstreams: dict[str, Upstream] = {}
+_lrus: dict[str, LRU] = {}
+
+
+def lru(name: str, max_entries: int, max_bytes: int = 0, sizeof: Callable[[Any], int] = approx_size) -> LRU:
+    """Get or create a standalone in-process LRU (listed in ``stats``)."""
+    cache = _lrus.get(name)
+    if cache is None:
+        cache = _lrus[name] = LRU(name, max_entries, max_bytes, sizeof)
+    return cache
+
+
+def upstream(name: str, fail_ttl: float = 30.0) -> Upstream:
+    """Get or create the failure tracker for provider ``name``."""
+    up = _upstreams.get(name)
+    if up is None:
+        up = _upstreams[name] = Upstream(name, fail_ttl)
+    return up
+
+
+@dataclass
+class Fetched:
+    value: Any
+    stale: bool = False
+
+
+@dataclass
+class Demand:
+    """How often ``key`` was asked for through ``fetch``, and how to reload it."""
+    key: str
+    load: Callable[[], Awaitable[Any]]
+    upstream: Upstream
+    hits: float = 0.0
+
+
+DEMAND_KEYS = 256        # keys tracked per namespace (LRU)
+DEMAND_WINDOW = 3600.0   # a key nobody asked for in this long is forgotten
+
+
+class Namespace:
+    """A named cache with its own TTL and hit/miss counters."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        stale_ttl: float = 0.0,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        env_ttl = os.getenv(f"CACHE_TTL_{name.upper()}")
+        self.ttl = float(env_ttl) if env_ttl else ttl
+        env_stale = os.getenv(f"CACHE_STALE_TTL_{name.upper()}")
+        self.stale_ttl = float(env_stale) if env_stale else stale_ttl
+        self._l1 = LRU(
+            name,
+            _env_int(f"CACHE_L1_ENTRIES_{name.upper()}", max_entries or L1_MAX_ENTRIES),
+            _env_int(f"CACHE_L1_BYTES_{name.upper()}", max_bytes or L1_MAX_BYTES),
+            sizeof=lambda entry: approx_size(entry.value),
+        )
+        self._refreshing: dict[str, asyncio.Task] = {}
+        self._demand = LRU(f"{name}:demand", DEMAND_KEYS, sizeof=lambda _: 0)
+        self.hits_l1 = 0
+        self.hits_l2 = 0
+        self.misses = 0
+        self.stale_served = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Entry]:
+        now = time.time() if now is None else now
+        entry = self._l1.get(key, now)
+        if entry and (now - entry.stored_at) < self.ttl:
+            self.hits_l1 += 1
+            return entry
+        try:
+            entry = backend.get(self._key(key), now)
+        except sqlite3.Error:
+            entry = None
+        # L2 rows outlive the TTL by stale_ttl
+        if entry and (now - entry.stored_at) < self.ttl:
+            self._remember(key, entry)
+            self.hits_l2 += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def _remember(self, key: str, entry: Entry) -> None:
+        # L1 keeps an entry as long as it may be served, stale included
+        self._l1.set(key, entry, entry.stored_at + self.ttl + self.stale_ttl)
+
+    def get_stale(self, key: str, now: Optional[float] = None) -> Optional[Entry]:
+        """The entry for ``key`` even if expired, within ``stale_ttl`` of expiry."""
+        now = time.time() if now is None else now
+        entry = self._l1.get(key, now)
+        if entry:
+            return entry
+        try:
+            entry = backend.get(self._key(key), now)
+        except sqlite3.Error:
+            entry = None
+        if entry and (now - entry.stored_at) < self.ttl + self.stale_ttl:
+            self._remember(key, entry)
+            return entry
+        return None
+
+    async def _load(self, key: str, load: Callable[[], Awaitable[Any]], up: Upstream) -> Any:
+        try:
+            value = await load()
+        except Exception as exc:
+            print(f"WARN cache[{self.name}] {up.name} failed:", exc)
+            up.failed()
+            raise
+        up.ok()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def _refresh(self, key: str, load: Callable[[], Awaitable[Any]], up: Upstream) -> None:
+        """Start loading ``key`` in a task unless a load for it is under way."""
+        if key in self._refreshing:
+            return
+        task = asyncio.ensure_future(self._load(key, load, up))
+        self._refreshing[key] = task
+
+        def _done(t: asyncio.Task) -> None:
+            self._refreshing.pop(key, None)
+            if not t.cancelled():
+                t.exception()  # already logged and recorded on the upstream
+
+        task.add_done_callback(_done)
+
+    async def fetch(self, key: str, load: Callable[[], Awaitable[Any]], up: Upstream) -> Optional[Fetched]:
+        """Fresh entry, else ``await load()`` (cached unless None).
+
+        ``load`` raises when the upstream fails. Then, and while ``up`` is
+        down, the stale entry is returned (``stale=True``), or None if there
+        is none. While ``up`` is merely suspect, a stale entry is returned
+        at once and refreshed in the background. Concurrent misses for the
+        same key share one ``load`` (single-flight, per worker).
+        """
+        self._track(key, load, up)
+        hit = self.get(key)
+        if hit:
+            return Fetched(hit.value)
+        old = self.get_stale(key) if self.stale_ttl else None
+        if up.down():
+            up.skipped += 1
+            return self._stale(old)
+        if old is not None and up.suspect():
+            self._refresh(key, load, up)
+            return self._stale(old)
+        self._refresh(key, load, up)
+        try:
+            # shielded: a caller that goes away doesn't cancel the shared load
+            value = await asyncio.shield(self._refreshing[key])
+        except Exception:
+            return self._stale(old)
+        return None if value is None else Fetched(value)
+
+    def _track(self, key: str, load: Callable[[], Awaitable[Any]], up: Upstream) -> None:
+        now = time.time()
+        demand = self._demand.peek(key, now)
+        if demand is None:
+            demand = Demand(key, load, up)
+        demand.load = load  # latest closure; they all load the same thing
+        demand.hits += 1
+        self._demand.set(key, demand, now + DEMAND_WINDOW, now)
+
+    def hot(self, limit: int, min_hits: float = 1.0) -> list[Demand]:
+        """The most requested keys (via ``fetch``), busiest first."""
+        ranked = sorted((d for _, d in self._demand.items()), key=lambda d: d.hits, reverse=True)
+        return [d for d in ranked[:limit] if d.hits >= min_hits]
+
+    def decay(self, factor: float) -> None:
+        for _, demand in self._demand.items():
+            demand.hits *= factor
+
+    def age(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since ``key`` was stored (newest of L1 and L2), None if absent.
+        Doesn't count as a lookup."""
+        now = time.time() if now is None else now
+        entry = self._l1.peek(key, now)
+        if entry is None or now - entry.stored_at >= self.ttl:
+            try:
+                shared = backend.get(self._key(key), now)
+            except sqlite3.Error:
+                shared = None
+            if shared is not None and (entry is None or shared.stored_at > entry.stored_at):
+                # another worker refreshed it
+                self._remember(key, shared)
+                entry = shared
+        return None if entry is None else now - entry.stored_at
+
+    async def refresh(self, key: str, load: Callable[[], Awaitable[Any]], up: Upstream) -> bool:
+        """Reload ``key`` now, joining a refresh already under way; True on success."""
+        self._refresh(key, load, up)
+        task = self._refreshing.get(key)
+        if task is None:
+            return False
+        await asyncio.wait([task])
+        return not task.cancelled() and task.exception() is None
+
+    def _stale(self, old: Optional[Entry]) -> Optional[Fetched]:
+        if old is None:
+            return None
+        self.stale_served += 1
+        return Fetched(old.value, stale=True)
+
+    def set(self, key: str, value: Any, now: Optional[float] = None) -> Entry:
+        entry = Entry(value, time.time() if now is None else now)
+        self._remember(key, entry)
+        try:
+            backend.set(self._key(key), entry, self.ttl + self.stale_ttl)
+        except sqlite3.Error as exc:
+            print(f"WARN cache[{self.name}] L2 set failed:", exc)
+        return entry
+
+    def clear(self) -> None:
+        self._l1.clear()
+        try:
+            backend.delete_prefix(self._key(""))
+        except sqlite3.Error:
+            pass
+
+    def version(self) -> int:
+        """Shared version counter for write-driven invalidation.
+
+        If the shared store fails (locked, disk full), a per-worker counter
+        stands in so callers keep working; other workers then see this
+        worker's writes only once their entries expire.
+        """
+        try:
+            return backend.counter(self._key("__version__"))
+        except sqlite3.Error as exc:
+            print(f"WARN cache[{self.name}] version read failed, using per-worker counter:", exc)
+            return _local_counters.counter(self._key("__version__"))
+
+    def bump_version(self) -> int:
+        self._l1.clear()
+        try:
+            return backend.incr(self._key("__version__"))
+        except sqlite3.Error as exc:
+            print(f"WARN cache[{self.name}] version bump failed, using per-worker counter:", exc)
+            return _local_counters.incr(self._key("__version__"))
+
+    def stats(self) -> dict:
+        lookups = self.hits_l1 + self.hits_l2 + self.misses
+        return {
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+            # entries, approximate (encoded/compressed) bytes, evictions
+            "l1": self._l1.stats(),
+            "hits_l1": self.hits_l1,
+            "hits_l2": self.hits_l2,
+            "misses": self.misses,
+            "stale_served": self.stale_served,
+            "tracked_keys": len(self._demand),
+            "hit_ratio": round((self.hits_l1 + self.hits_l2) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_namespaces: dict[str, Namespace] = {}
+
+
+def namespaces() -> list[Namespace]:
+    return list(_namespaces.values())
+
+
+def namespace(
+    name: str,
+    ttl: float,
+    stale_ttl: float = 0.0,
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> Namespace:
+    """Get or create the namespace ``name`` (settings apply on first creation)."""
+    ns = _namespaces.get(name)
+    if ns is None:
+        ns = _namespaces[name] = Namespace(name, ttl, stale_ttl, max_entries, max_bytes)
+    return ns
+
+
+SNAPSHOT_PATH = os.getenv(
+    "CACHE_SNAPSHOT_PATH",
+    os.path.join(CACHE_DIR, "cache-snapshot.sqlite3"),
+)
+
+
+def snapshot(path: Optional[str] = None, now: Optional[float] = None) -> int:
+    """Write every live L1 entry (stale ones within ``stale_ttl`` included) to
+    the snapshot file; returns the entry count.
+
+    Called on shutdown. With several workers each one merges its own L1 in,
+    so the file ends up with the union of what the workers had hot.
+    """
+    path = SNAPSHOT_PATH if path is None else path
+    if not path:
+        return 0
+    now = time.time() if now is None else now
+    store = SQLiteBackend(path)
+    conn = store._conn()
+    written = 0
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for ns in list(_namespaces.values()):
+            for key, entry in ns._l1.items():
+                if now - entry.stored_at < ns.ttl + ns.stale_ttl:
+                    store.set(ns._key(key), entry, ns.ttl + ns.stale_ttl)
+                    written += 1
+        conn.execute("COMMIT")
+        store.purge(now)
+    except sqlite3.Error as exc:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        print("WARN cache snapshot failed:", exc)
+        written = 0
+    finally:
+        store.close()
+    return written
+
+
+def restore(path: Optional[str] = None, now: Optional[float] = None) -> int:
+    """Load live snapshot entries into L1 (and L2 where it has none).
+
+    Entries keep their original ``stored_at``, so a restored value never
+    outlives its namespace TTL (or is served past it only as stale). Namespaces that no longer exist are skipped.
+    """
+    path = SNAPSHOT_PATH if path is None else path
+    if not path or not os.path.exists(path):
+        return 0
+    now = time.time() if now is None else now
+    store = SQLiteBackend(path)
+    try:
+        items = store.items(now)
+    except (sqlite3.Error, ValueError) as exc:
+        print("WARN cache restore failed:", exc)
+        return 0
+    finally:
+        store.close()
+    restored = 0
+    for full_key, entry in items:
+        name, _, key = full_key.partition(":")
+        ns = _namespaces.get(name)
+        if ns is None or now - entry.stored_at >= ns.ttl + ns.stale_ttl:
+            continue
+        ns._remember(key, entry)
+        try:
+            if backend.get(full_key, now) is None:
+                backend.set(full_key, entry, ns.ttl + ns.stale_ttl)
+        except sqlite3.Error:
+            pass
+        restored += 1
+    return restored
+
+
+def stats() -> dict:
+    return {
+        "backend": type(backend).__name__,
+        "namespaces": {name: ns.stats() for name, ns in sorted(_namespaces.items())},
+        "upstreams": {name: up.stats() for name, up in sorted(_upstreams.items())},
+        "lru": {name: c.stats() for name, c in sorted(_lrus.items())},
+    }
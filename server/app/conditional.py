@@ -0,0 +1,119 @@
+"""Conditional GET helpers: strong ETags, If-None-Match and 304 responses.
+
+Cached responses are encoded and compressed once when cached
+(``cached_body``); every hit then just writes the variant the client accepts
+(``send_cached``). GZipMiddleware passes bodies that already carry
+Content-Encoding through untouched.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from .cache import CachedBody
+from .responses import FastJSONResponse, dumps
+
+try:  # optional: brotli variant when the package is installed
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# below this, compression isn't worth it (matches GZipMiddleware minimum_size)
+COMPRESS_MIN_BYTES = 500
+
+# per-user data: only the client may cache, and must revalidate each time
+PRIVATE_REVALIDATE = "private, no-cache"
+PUBLIC_REVALIDATE = "public, no-cache"
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def row_etag(*parts: Any) -> str:
+    """Strong ETag from a row version, e.g. ``row_etag("post", id, updated_at)``."""
+    return f'"{_digest("|".join(str(p) for p in parts).encode())}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag from the serialized response body."""
+    return f'"{_digest(body)}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    if inm.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in inm.split(","))
+
+
+def not_modified(etag: str, cache_control: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+def conditional_json(
+    request: Request,
+    content: Any,
+    *,
+    etag: Optional[str] = None,
+    cache_control: str = PUBLIC_REVALIDATE,
+) -> Response:
+    """Return ``content`` as JSON, or a bare 304 if the client's copy is current.
+
+    Without an explicit ``etag`` the body is serialized first and hashed.
+    """
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    response = FastJSONResponse(content)
+    if etag is None:
+        etag = body_etag(response.body)
+        if etag_matches(request, etag):
+            return not_modified(etag, cache_control)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def cached_body(content: Any, etag: Optional[str] = None) -> CachedBody:
+    """Encode ``content`` once and keep only the variants worth storing."""
+    raw = content if isinstance(content, bytes) else dumps(content)
+    body = CachedBody(etag=etag or body_etag(raw), media_type="application/json")
+    if len(raw) < COMPRESS_MIN_BYTES:
+        body.identity = raw
+        return body
+    body.gzip = gzip.compress(raw, compresslevel=6, mtime=0)
+    if brotli is not None:
+        body.br = brotli.compress(raw, quality=5)
+    return body
+
+
+def _accepts(request: Request, coding: str) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip().lower() == coding:
+            return params.replace(" ", "") not in {"q=0", "q=0.0"}
+    return False
+
+
+def send_cached(request: Request, body: CachedBody, cache_control: str) -> Response:
+    """304, or the stored variant matching Accept-Encoding as-is."""
+    headers = {"ETag": body.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request, body.etag):
+        return Response(status_code=304, headers=headers)
+    if body.identity is not None:
+        return Response(body.identity, media_type=body.media_type, headers=headers)
+    if body.br is not None and _accepts(request, "br"):
+        headers["Content-Encoding"] = "br"
+        return Response(body.br, media_type=body.media_type, headers=headers)
+    if _accepts(request, "gzip"):
+        headers["Content-Encoding"] = "gzip"
+        return Response(body.gzip, media_type=body.media_type, headers=headers)
+    # rare: client without gzip support gets a one-off decompression
+    return Response(gzip.decompress(body.gzip or b""), media_type=body.media_type, headers=headers)
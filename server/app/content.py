@@ -0,0 +1,80 @@
+"""Helpers for deriving plain text from user-authored post HTML."""
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+
+_SKIP_TAGS = {"script", "style", "noscript", "template"}
+_BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "tr"}
+_WS_RE = re.compile(r"\s+")
+
+EXCERPT_CHARS = 160
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self.images: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "img":
+            src = dict(attrs).get("src")
+            if src and not src.startswith("data:"):
+                self.images.append(src)
+        if tag in _SKIP_TAGS:
+            self._skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def _extract(html: str | None) -> _TextExtractor:
+    parser = _TextExtractor()
+    if html:
+        parser.feed(html)
+        parser.close()
+    return parser
+
+
+def html_to_text(html: str | None) -> str:
+    """Visible text of ``html`` with tags dropped and whitespace collapsed."""
+    return _WS_RE.sub(" ", "".join(_extract(html).parts)).strip()
+
+
+def make_excerpt(text: str, limit: int = EXCERPT_CHARS) -> str:
+    """Cut ``text`` to ``limit`` chars, preferring a word boundary."""
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def derive_post_fields(content_html: str | None, cover: str | None, images: list[str] | None) -> dict:
+    """Columns precomputed at write time so feed reads never parse HTML/JSON.
+
+    - excerpt: plain-text preview (tags/scripts stripped, so safe to render)
+    - word_count: whitespace-separated words, the reading-length measure
+    - primary_image: cover, else first attached image, else first inline <img>
+    """
+    parsed = _extract(content_html)
+    text = _WS_RE.sub(" ", "".join(parsed.parts)).strip()
+    primary = cover or next((i for i in images or [] if i), None) or (parsed.images[0] if parsed.images else None)
+    return {
+        "excerpt": make_excerpt(text),
+        "word_count": len(text.split()),
+        "primary_image": primary,
+    }
@@ -0,0 +1,103 @@
+"""Incrementally maintained totals (``counters`` table).
+
+A counter is changed in the same transaction as the row it counts, so a read
+is one primary-key lookup and every worker sees the same committed value.
+Each counter has a source query used only to seed it (startup, or the first
+write after the row went missing) — never on the read path.
+
+Two flavours, one per database in this app:
+- SQLAlchemy (``add``/``get``/``seed``): users, neighbor posts
+- raw sqlite3 (``add_raw``/``get_raw``/``seed_raw``): trips, rewards in
+  ``db.sqlite3`` (routers/trips.py)
+"""
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable
+
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+USERS = "users"
+NEIGHBOR_POSTS = "neighbor_posts"
+TRIPS = "trips"
+REWARDS_CLAIMED = "rewards_claimed"
+
+_SOURCES = {
+    USERS: select(func.count(models.User.id)),
+    NEIGHBOR_POSTS: select(func.count(models.NeighborPost.id)),
+}
+
+_RAW_SOURCES = {
+    TRIPS: "SELECT COUNT(*) FROM trips",
+    REWARDS_CLAIMED: "SELECT COUNT(*) FROM rewards",
+}
+
+
+def add(db: Session, name: str, delta: int = 1) -> None:
+    """Apply ``delta`` inside the caller's transaction (commit is theirs)."""
+    result = db.execute(
+        update(models.Counter)
+        .where(models.Counter.name == name)
+        .values(value=models.Counter.value + delta)
+    )
+    if result.rowcount == 0:
+        # not seeded yet: count from the source, which already sees this write
+        db.flush()
+        db.add(models.Counter(name=name, value=db.execute(_SOURCES[name]).scalar_one()))
+
+
+def get(db: Session, name: str) -> int:
+    value = db.execute(select(models.Counter.value).where(models.Counter.name == name)).scalar()
+    if value is None:
+        value = db.execute(_SOURCES[name]).scalar_one()
+    return int(value)
+
+
+def seed(db: Session) -> None:
+    """Create missing counters from their source counts (idempotent)."""
+    existing = set(db.scalars(select(models.Counter.name)))
+    for name, query in _SOURCES.items():
+        if name not in existing:
+            db.add(models.Counter(name=name, value=db.execute(query).scalar_one()))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # another worker seeded them first
+
+
+def recount(db: Session) -> None:
+    """Reset every counter to its source count (after bulk loads/migrations)."""
+    for name, query in _SOURCES.items():
+        value = db.execute(query).scalar_one()
+        if db.get(models.Counter, name) is None:
+            db.add(models.Counter(name=name, value=value))
+        else:
+            db.execute(update(models.Counter).where(models.Counter.name == name).values(value=value))
+    db.commit()
+
+
+def seed_raw(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+    )
+    for name, query in _RAW_SOURCES.items():
+        conn.execute(f"INSERT OR IGNORE INTO counters(name, value) SELECT ?, ({query})", (name,))
+    conn.commit()
+
+
+def add_raw(conn: sqlite3.Connection, name: str, delta: int = 1) -> None:
+    """Raw sqlite3 counterpart of ``add``; runs in the connection's open transaction."""
+    if delta:
+        conn.execute("UPDATE counters SET value = value + ? WHERE name=?", (delta, name))
+
+
+def get_raw(conn: sqlite3.Connection, names: Iterable[str]) -> dict[str, int]:
+    names = list(names)
+    rows = conn.execute(
+        f"SELECT name, value FROM counters WHERE name IN ({','.join('?' * len(names))})", names
+    ).fetchall()
+    return {row[0]: int(row[1]) for row in rows}
@@ -1,7 +1,8 @@
 import os
-from typing import Final
+from contextlib import contextmanager
+from typing import Final, Iterator
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 
@@ -52,6 +53,63 @@ class Base(DeclarativeBase):
     pass
 
 
+try:
+    import fcntl
+except ImportError:  # Windows 개발 환경: 잠금 없이 진행
+    fcntl = None
+
+_SCHEMA_LOCK_KEY = 0x52414C  # pg advisory lock id for schema upgrades
+
+
+@contextmanager
+def schema_lock() -> Iterator[None]:
+    """Serialize schema upgrades across processes.
+
+    Every gunicorn worker runs them at import; this makes the second one wait
+    and then find the work done. Postgres uses an advisory lock, SQLite a
+    lock file next to the database.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": _SCHEMA_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _SCHEMA_LOCK_KEY})
+        return
+    path = engine.url.database if engine.dialect.name == "sqlite" else None
+    if not path or path == ":memory:" or fcntl is None:
+        yield
+        return
+    with open(f"{path}.schema-lock", "a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def ensure_columns(table: str, columns: dict[str, str]) -> list[str]:
+    """Add columns that create_all() can't add to an existing table.
+
+    ``columns`` maps column name to its DDL (e.g. ``"INTEGER NOT NULL DEFAULT 0"``).
+    Returns the names that were added so callers can backfill them.
+    """
+    insp = inspect(engine)
+    if not insp.has_table(table):
+        return []
+    existing = {c["name"] for c in insp.get_columns(table)}
+    # SQLite has no IF NOT EXISTS here; upgrade_schema() holds schema_lock() instead
+    guard = "IF NOT EXISTS " if engine.dialect.name == "postgresql" else ""
+    added = []
+    with engine.begin() as conn:
+        for name, ddl in columns.items():
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {guard}{name} {ddl}"))
+                added.append(name)
+    return added
+
+
 def get_db():
     db = SessionLocal()
     try:
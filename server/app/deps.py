@@ -1,17 +1,37 @@
 # server/app/deps.py
+import os
+import time
+from dataclasses import dataclass
 from typing import Optional
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
-from . import models, security
-from .database import get_db
+from . import cache, models, security
+from .database import SessionLocal, get_db
 
 bearer_scheme = HTTPBearer(auto_error=False)  # Authorization 헤더가 없어도 에러 안 내고 None 반환
 
 
+@dataclass(frozen=True)
+class Principal:
+    """인증된 사용자의 최소 정보. id/이름만 필요한 핸들러는 ORM User 대신 이걸 받는다."""
+    id: int
+    display_name: Optional[str]
+    email: str
+
+
+# verified tokens: token -> user id, valid until the token's own exp
+_token_cache = cache.lru("auth_tokens", int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")))
+# user snapshots: id -> Principal, short TTL bounds staleness across workers
+_principal_cache = cache.lru("auth_principals", int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000")))
+PRINCIPAL_TTL = float(os.getenv("AUTH_PRINCIPAL_TTL", "30"))
+
+
 def _decode_access_token(token: str) -> Optional[dict]:
     try:
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
@@ -20,6 +40,85 @@ def _decode_access_token(token: str) -> Optional[dict]:
         return None
 
 
+def _user_id_from_token(token: str) -> Optional[int]:
+    """Verified ``sub`` of ``token``; the signature is checked once per token."""
+    now = time.time()
+    user_id = _token_cache.get(token, now)
+    if user_id is not None:
+        return user_id
+
+    payload = _decode_access_token(token)
+    if not payload:
+        return None
+    # SQLAlchemy 1.4/2.x 호환: get(primary_key) 용 int
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _token_cache.set(token, user_id, float(exp))
+    return user_id
+
+
+def invalidate_user(user_id: int) -> None:
+    _principal_cache.pop(user_id)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _on_user_change(mapper, connection, target) -> None:
+    # this worker drops its snapshot now; other workers within PRINCIPAL_TTL
+    invalidate_user(target.id)
+
+
+def _load_principal(user_id: int) -> Optional[Principal]:
+    now = time.time()
+    principal = _principal_cache.get(user_id, now)
+    if principal is not None:
+        return principal
+    db = SessionLocal()
+    try:
+        user = db.get(models.User, user_id)
+        if not user:
+            return None
+        principal = Principal(id=user.id, display_name=user.display_name, email=user.email)
+    finally:
+        db.close()
+    _principal_cache.set(user_id, principal, now + PRINCIPAL_TTL)
+    return principal
+
+
+async def get_principal_optional(
+    creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Optional[Principal]:
+    """
+    get_current_user_optional과 같지만 캐시된 Principal을 반환.
+    - 캐시 적중 시 DB 세션을 열지 않음
+    - 캐시 미스 시 DB 조회는 threadpool에서 (이벤트 루프를 막지 않음)
+    """
+    if not creds:
+        return None
+    user_id = _user_id_from_token(creds.credentials)
+    if user_id is None:
+        return None
+    principal = _principal_cache.get(user_id, time.time())
+    if principal is not None:
+        return principal
+    return await run_in_threadpool(_load_principal, user_id)
+
+
+async def get_principal_required(
+    principal: Optional[Principal] = Depends(get_principal_optional),
+) -> Principal:
+    if not principal:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+        )
+    return principal
+
+
 async def get_current_user_optional(
     creds: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
     db: Session = Depends(get_db),
@@ -32,21 +131,11 @@ async def get_current_user_optional(
     if not creds:
         return None
 
-    payload = _decode_access_token(creds.credentials)
-    if not payload:
-        return None
-
-    user_id = payload.get("sub")
-    if not user_id:
-        return None
-
-    # SQLAlchemy 1.4/2.x 호환: get(primary_key)
-    try:
-        user_id_int = int(user_id)
-    except (TypeError, ValueError):
+    user_id = _user_id_from_token(creds.credentials)
+    if user_id is None:
         return None
 
-    return db.get(models.User, user_id_int)
+    return db.get(models.User, user_id)
 
 
 async def get_current_user_required(
@@ -0,0 +1,123 @@
+"""Small geo helpers: distances, bounding boxes, a fixed lat/lng tile grid
+and screen-space grid clustering.
+
+Tiles are aligned to multiples of their size in degrees, so any two requests
+that overlap share tiles, whatever their exact center or radius.
+"""
+from __future__ import annotations
+
+import math
+from typing import Callable, Iterable, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+EARTH_RADIUS_KM = 6371.0088
+TILE_PX = 256  # web map tile edge in pixels (zoom 0 = one tile)
+_MAX_LAT = 85.05112878
+
+# tile edge sizes in degrees, finest first (0.05° ≈ 5.5 km north-south)
+TILE_SIZES = (0.05, 0.1, 0.2, 0.4, 0.8, 1.6)
+MAX_TILES_CAP = 64  # hard limit per lookup, whatever max_tiles asks for
+
+
+class BBox(NamedTuple):
+    west: float
+    south: float
+    east: float
+    north: float
+
+
+# 한국 영역(제주·독도 포함): culture/KOPIS 데이터가 있는 범위
+KOREA = BBox(124.0, 33.0, 132.0, 39.0)
+
+
+class Tile(NamedTuple):
+    size: float
+    ix: int
+    iy: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.size:g}:{self.ix}:{self.iy}"
+
+    @property
+    def bbox(self) -> BBox:
+        return BBox(self.ix * self.size, self.iy * self.size, (self.ix + 1) * self.size, (self.iy + 1) * self.size)
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_from_center(lat: float, lng: float, radius_km: float) -> BBox:
+    dlat = radius_km / 111.0
+    dlng = radius_km / (111.0 * max(math.cos(math.radians(lat)), 1e-6))
+    return BBox(lng - dlng, lat - dlat, lng + dlng, lat + dlat)
+
+
+def clip(bbox: BBox, extent: BBox) -> Optional[BBox]:
+    """``bbox`` ∩ ``extent``, None when they don't overlap."""
+    out = BBox(max(bbox.west, extent.west), max(bbox.south, extent.south),
+               min(bbox.east, extent.east), min(bbox.north, extent.north))
+    return out if out.west <= out.east and out.south <= out.north else None
+
+
+def _span(lo: float, hi: float, size: float) -> range:
+    return range(math.floor(lo / size), math.floor(hi / size) + 1)
+
+
+class TooManyTiles(ValueError):
+    """Even the coarsest tiles would exceed MAX_TILES_CAP."""
+
+
+def tiles_for_bbox(bbox: BBox, max_tiles: int = 16) -> list[Tile]:
+    """Cover ``bbox`` with the finest tile size that needs at most ``max_tiles``,
+    else with the coarsest size; raises TooManyTiles past MAX_TILES_CAP."""
+    for size in TILE_SIZES:
+        xs, ys = _span(bbox.west, bbox.east, size), _span(bbox.south, bbox.north, size)
+        if len(xs) * len(ys) <= max_tiles or size == TILE_SIZES[-1]:
+            if len(xs) * len(ys) > MAX_TILES_CAP:
+                raise TooManyTiles(f"{len(xs) * len(ys)} tiles")
+            return [Tile(size, ix, iy) for iy in ys for ix in xs]
+    return []  # unreachable
+
+
+def in_bbox(bbox: BBox, lat: float, lng: float) -> bool:
+    return bbox.south <= lat <= bbox.north and bbox.west <= lng <= bbox.east
+
+
+def to_float(value) -> Optional[float]:
+    try:
+        f = float(value)
+    except (TypeError, ValueError):
+        return None
+    return f if math.isfinite(f) else None
+
+
+def mercator_px(lat: float, lng: float, zoom: int) -> tuple[float, float]:
+    """Web Mercator pixel coordinates of a point at ``zoom``."""
+    scale = TILE_PX * (1 << zoom)
+    s = math.sin(math.radians(max(min(lat, _MAX_LAT), -_MAX_LAT)))
+    x = (lng + 180.0) / 360.0 * scale
+    y = (0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def grid_cells(bbox: BBox, zoom: int, cell_px: int) -> int:
+    """How many ``cell_px`` grid cells cover ``bbox`` on screen at ``zoom``."""
+    x0, y0 = mercator_px(bbox.north, bbox.west, zoom)
+    x1, y1 = mercator_px(bbox.south, bbox.east, zoom)
+    return (int(x1 // cell_px) - int(x0 // cell_px) + 1) * (int(y1 // cell_px) - int(y0 // cell_px) + 1)
+
+
+def grid_cluster(points: Iterable[T], coords: Callable[[T], tuple[float, float]], zoom: int, cell_px: int) -> list[list[T]]:
+    """Group points by the ``cell_px`` screen cell they fall in at ``zoom``."""
+    cells: dict[tuple[int, int], list[T]] = {}
+    for p in points:
+        x, y = mercator_px(*coords(p), zoom)
+        cells.setdefault((int(x // cell_px), int(y // cell_px)), []).append(p)
+    return list(cells.values())
@@ -0,0 +1,153 @@
+"""Resized WebP variants of uploaded images (post covers, proof photos).
+
+Phone photos arrive at 3–8 MB, but feed cards and trip summaries show them a
+few hundred pixels wide. Once an upload is stored, ``routers/uploads.py``
+renders a ``thumb`` and a ``medium`` WebP next to the original
+(``<name>.thumb.webp``, ``<name>.medium.webp``) in a process pool, off the
+request path, and records them here; summary payloads then swap in the thumb
+for every URL that has one. Files that predate this are covered by
+``scripts/backfill_image_variants.py``.
+
+Pillow is optional: without it uploads work as before and no variants are
+made.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import multiprocessing
+import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow 미설치: 변형 이미지 없이 원본만 사용
+    Image = None
+    ImageOps = None
+
+# longest edge in pixels; images already smaller are only re-encoded
+SIZES = {
+    "thumb": int(os.getenv("IMAGE_THUMB_PX", "320")),
+    "medium": int(os.getenv("IMAGE_MEDIUM_PX", "1280")),
+}
+WEBP_QUALITY = int(os.getenv("IMAGE_WEBP_QUALITY", "80"))
+# processes per API worker; 0 renders on a thread instead (dev)
+WORKERS = int(os.getenv("IMAGE_WORKERS", "1"))
+# pending jobs per API worker; uploads beyond this get no variants until the
+# backfill runs
+QUEUE_LIMIT = int(os.getenv("IMAGE_QUEUE_LIMIT", "32"))
+MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))  # decompression-bomb guard
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight = 0
+_tasks: set[asyncio.Task] = set()
+
+
+def enabled() -> bool:
+    if Image is None:
+        return False
+    return os.getenv("IMAGE_VARIANTS_ENABLED", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def variant_name(filename: str, variant: str) -> str:
+    stem, _ = posixpath.splitext(filename)
+    return f"{stem}.{variant}.webp"
+
+
+def is_variant(filename: str) -> bool:
+    return any(filename.endswith(f".{variant}.webp") for variant in SIZES)
+
+
+def render(path: str) -> dict[str, bytes]:
+    """WebP bytes of every variant of the image at ``path``. Runs in the pool."""
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    out: dict[str, bytes] = {}
+    with Image.open(path) as src:
+        # JPEG: decode at a reduced scale that still covers the largest variant
+        largest = max(SIZES.values())
+        src.draft("RGB", (largest, largest))
+        im = ImageOps.exif_transpose(src)
+        if im.mode not in ("RGB", "RGBA"):
+            has_alpha = "A" in im.getbands() or "transparency" in im.info
+            im = im.convert("RGBA" if has_alpha else "RGB")
+        # largest first, each one shrunk from the previous
+        for name, px in sorted(SIZES.items(), key=lambda kv: -kv[1]):
+            im.thumbnail((px, px), Image.LANCZOS)
+            buf = io.BytesIO()
+            im.save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+            out[name] = buf.getvalue()
+    return out
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if WORKERS <= 0:
+        return None
+    if _pool is None:
+        # spawn: never fork a process that already runs an event loop/threads
+        _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def render_async(path: str) -> dict[str, bytes]:
+    pool = _get_pool()
+    if pool is None:
+        return await asyncio.to_thread(render, path)
+    return await asyncio.get_running_loop().run_in_executor(pool, render, path)
+
+
+def _done(task: asyncio.Task) -> None:
+    global _inflight
+    _inflight -= 1
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print("WARN image variants failed:", task.exception())
+
+
+def schedule(job: Callable[[], Awaitable]) -> bool:
+    """Run ``job`` in the background; False (nothing started) when the queue is full."""
+    global _inflight
+    if _inflight >= QUEUE_LIMIT:
+        return False
+    _inflight += 1
+    task = asyncio.get_running_loop().create_task(job())
+    _tasks.add(task)
+    task.add_done_callback(_done)
+    return True
+
+
+def shutdown() -> None:
+    global _pool
+    for task in list(_tasks):
+        task.cancel()
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def record(url: str, variants: dict[str, str]) -> None:
+    """Remember the variant URLs of ``url`` (blocking; call off the loop)."""
+    db = SessionLocal()
+    try:
+        db.merge(models.ImageVariant(url=url, thumb=variants.get("thumb"), medium=variants.get("medium")))
+        db.commit()
+    finally:
+        db.close()
+
+
+def thumbs(db: Session, urls: Iterable[Optional[str]]) -> dict[str, str]:
+    """url -> thumb URL for those of ``urls`` that have one (one query)."""
+    wanted = {url for url in urls if url}
+    if not wanted:
+        return {}
+    rows = db.query(models.ImageVariant.url, models.ImageVariant.thumb).filter(
+        models.ImageVariant.url.in_(wanted), models.ImageVariant.thumb.isnot(None)
+    )
+    return {url: thumb for url, thumb in rows}
@@ -0,0 +1,104 @@
+"""Streaming parser for KOPIS list responses.
+
+``pblprfr`` returns ``<dbs><db>…</db>…</dbs>``. Instead of building the
+whole xmltodict tree, ``parse_performances`` walks the body with iterparse,
+keeps only ``FIELDS`` of each ``<db>`` and frees elements as it goes.
+
+Records are tuple-backed (``Performance``), which is also how they are cached:
+JSON arrays in ``FIELDS`` order, turned back into dicts only for responses.
+"""
+from __future__ import annotations
+
+import io
+import xml.etree.ElementTree as ET
+from typing import Iterable, NamedTuple, Optional
+
+
+class Performance(NamedTuple):
+    mt20id: Optional[str]
+    prfnm: Optional[str]
+    prfpdfrom: Optional[str]
+    prfpdto: Optional[str]
+    fcltynm: Optional[str]
+    poster: Optional[str]
+    area: Optional[str]
+    genrenm: Optional[str]
+    openrun: Optional[str]
+    prfstate: Optional[str]
+
+
+FIELDS = Performance._fields
+_FIELD_SET = frozenset(FIELDS)
+
+
+class MalformedResponse(ValueError):
+    """A KOPIS body that is not a ``<dbs>`` listing (truncated, HTML error page…)."""
+
+
+def parse_performances(content: bytes) -> list[Performance]:
+    """Performances in ``content`` (empty for an empty ``<dbs/>``).
+
+    Raises ``MalformedResponse`` for a body that does not parse or whose root
+    is not ``<dbs>``, so the cache counts it as an upstream failure and keeps
+    serving the last good page instead of caching an empty one.
+    """
+    out: list[Performance] = []
+    values: dict[str, Optional[str]] = {}
+    root: Optional[str] = None
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(content), events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if root is None:
+                    root = tag
+                    if root != "dbs":
+                        raise MalformedResponse(f"unexpected root <{root}>")
+            elif tag in _FIELD_SET:
+                text = elem.text
+                values[tag] = text.strip() if text else None
+            elif tag == "db":
+                out.append(Performance(*(values.get(f) for f in FIELDS)))
+                values = {}
+                elem.clear()
+    except ET.ParseError as exc:
+        raise MalformedResponse(str(exc)) from exc
+    return out
+
+
+# pblprfr/{mt20id}: fields kept from a detail <db>
+DETAIL_FIELDS = (
+    "mt20id", "prfnm", "prfpdfrom", "prfpdto", "fcltynm", "mt10id", "prfcast",
+    "prfcrew", "prfruntime", "prfage", "entrpsnm", "pcseguidance", "poster", "sty",
+    "area", "genrenm", "openrun", "prfstate", "dtguidance",
+)
+
+
+def parse_detail(content: bytes) -> Optional[dict]:
+    """The one performance of a detail response, or None if it has none.
+
+    ``styurls`` (introduction images) comes back as a list of URLs.
+    """
+    try:
+        root = ET.fromstring(content)
+    except ET.ParseError:
+        return None
+    db = root if root.tag == "db" else root.find("db")
+    if db is None:
+        return None
+    out: dict = {}
+    for field in DETAIL_FIELDS:
+        text = db.findtext(field)
+        out[field] = text.strip() if text and text.strip() else None
+    if not out["mt20id"]:
+        return None
+    out["styurls"] = [u.text.strip() for u in db.iterfind("styurls/styurl") if u.text and u.text.strip()]
+    return out
+
+
+def from_rows(rows: Iterable[Iterable]) -> list[Performance]:
+    """Records back from their cached (JSON array) form."""
+    return [Performance(*row) for row in rows]
+
+
+def as_dicts(records: Iterable[Performance]) -> list[dict]:
+    return [dict(zip(FIELDS, r)) for r in records]
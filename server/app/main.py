@@ -4,8 +4,8 @@ load_dotenv()
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .database import Base, engine
-from . import models  # ensures metadata is registered before create_all
+from .schema_upgrade import upgrade_schema
+from . import images, prefetch, security, warmup
 from .routers import posts, auth  
 from .routers import stats as stats_router
 from .routers import culture as culture_router
@@ -15,6 +15,8 @@ from .routers import tour as tour_router
 from .routers import agency_trips as agency_trips_router
 from .routers import places as places_router
 from .routers import debug as debug_router
+from .routers import map as map_router
+from .routers import events as events_router
 from fastapi.staticfiles import StaticFiles
 from fastapi import Response
 from .routers import trips as trips_router
@@ -33,9 +35,9 @@ def now_kst():
 print("한국 시간:", now_kst().strftime("%Y-%m-%d %H:%M:%S"))
 
 
-# Ensure tables exist (idempotent). For prod consider migrations, but this
-# keeps new envs from booting without tables.
-Base.metadata.create_all(bind=engine)
+# Ensure tables exist (idempotent) and apply additive schema upgrades.
+# For prod consider migrations, but this keeps new envs from booting without tables.
+upgrade_schema()
 
 app = FastAPI(title="Read&Lead API")
 
@@ -66,6 +68,9 @@ cors_kwargs = dict(
     allow_headers=["*"],
 )
 
+# 프론트가 읽어야 하는 응답 헤더 (댓글 다음 페이지 cursor, 조건부 요청용 ETag)
+expose_headers = ["X-Next-Cursor", "ETag"]
+
 if allow_all:
     # With wildcard, browsers disallow credentials
     app.add_middleware(
@@ -73,6 +78,7 @@ if allow_all:
         allow_origins=["*"],
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=expose_headers,
         allow_credentials=False,
     )
 elif allowed_origin_regex:
@@ -81,6 +87,7 @@ elif allowed_origin_regex:
         allow_origin_regex=allowed_origin_regex,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=expose_headers,
         allow_credentials=True,
     )
 else:
@@ -89,53 +96,26 @@ else:
         allow_origins=allowed_origins,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=expose_headers,
         allow_credentials=True,
     )
 
-# Optional: background prewarm of lightweight endpoints to mitigate cold starts
+# Cache warm-up: restore the shutdown snapshot, then run the warmers that the
+# routers registered (app/warmup.py) in the background. Startup doesn't wait.
+# Afterwards popular upstream entries are kept warm by app/prefetch.py.
 @app.on_event("startup")
-async def _prewarm_lightweight():
-    """Fill small in-process caches on startup to reduce first-hit latency."""
-    try:
-        import time
-        from sqlalchemy.orm import joinedload, load_only
-        from .database import SessionLocal
-        from . import models as _models
-        from .routers import stats as _stats
-        from .routers import posts as _posts
-
-        now = time.time()
-        db = SessionLocal()
-        try:
-            # Users count cache
-            total = db.query(_models.User).count()
-            _stats._users_count_cache["v"] = int(total)  # type: ignore[attr-defined]
-            _stats._users_count_ts = now                  # type: ignore[attr-defined]
-
-            # Neighbor summaries cache (limit=30)
-            posts = (
-                db.query(_models.NeighborPost)
-                .options(
-                    load_only(
-                        _models.NeighborPost.id,
-                        _models.NeighborPost.title,
-                        _models.NeighborPost.cover,
-                        _models.NeighborPost.created_at,
-                    ),
-                    joinedload(_models.NeighborPost.author).load_only(_models.User.display_name),
-                )
-                .order_by(_models.NeighborPost.created_at.desc())
-                .limit(30)
-                .all()
-            )
-            rows = [_posts._post_to_summary(p) for p in posts]
-            _posts._summary_cache[30] = rows               # type: ignore[attr-defined]
-            _posts._summary_ts[30] = now                   # type: ignore[attr-defined]
-        finally:
-            db.close()
-    except Exception:
-        # Best-effort only
-        pass
+async def _start_warmup():
+    warmup.start()
+    prefetch.start()
+    uploads_router.start_sweeper()
+
+@app.on_event("shutdown")
+async def _on_shutdown():
+    await prefetch.stop()
+    await uploads_router.stop_sweeper()
+    await warmup.stop()
+    security.shutdown_hasher()
+    images.shutdown()
 
 # Simple request logger to diagnose method/path issues during auth
 @app.middleware("http")
@@ -158,6 +138,8 @@ app.include_router(kopis_router.router, prefix="/api/kopis", tags=["kopis"])  #
 app.include_router(uploads_router.router, prefix="/api", tags=["uploads"])  # /api/uploads
 app.include_router(agency_trips_router.router, prefix="/api/agency-trips", tags=["agency-trips"])  # /api/agency-trips/list
 app.include_router(tour_router.router, prefix="/api/tour", tags=["tour"])  # /api/tour/search
+app.include_router(map_router.router, prefix="/api/map", tags=["map"])  # /api/map/clusters
+app.include_router(events_router.router, prefix="/api/events", tags=["events"])  # /api/events/nearby
 
 # static mount for uploaded files
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
@@ -168,6 +150,11 @@ app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 def ping():
     return {"ok": True}
 
+# Readiness: serving as soon as the app is up; "warmup" reports cache warm-up
+@app.get("/api/ready")
+def ready():
+    return {"ok": True, "warmup": warmup.status()}
+
 app.include_router(trips_router.router, prefix="/api/trips", tags=["trips"])
 app.include_router(places_router.router, prefix="/api", tags=["places"])  # /api/places/upsert
 app.include_router(debug_router.router, prefix="/api/debug", tags=["debug"])  # /api/debug/diag
@@ -23,6 +23,13 @@ class NeighborPost(Base):
     images = Column(Text, nullable=True)  # JSON string
     created_at = Column(DateTime, default=lambda: datetime.now(KST), nullable=False)
     updated_at = Column(DateTime, default=lambda: datetime.now(KST), onupdate=lambda: datetime.now(KST), nullable=False)
+    # denormalized from neighbor_comments; maintained by create/delete_comment
+    comment_count = Column(Integer, default=0, server_default="0", nullable=False)
+    last_commented_at = Column(DateTime, nullable=True)
+    # derived from content at write time (see content.derive_post_fields)
+    excerpt = Column(String, nullable=True)
+    word_count = Column(Integer, default=0, server_default="0", nullable=False)
+    primary_image = Column(String, nullable=True)
     author = relationship("User", back_populates="posts")
 
 # helpful index for ordering by recency
@@ -37,3 +44,23 @@ class NeighborComment(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(KST), nullable=False)
 
     author = relationship("User")
+
+# keyset pagination of a post's comments in creation order
+Index('ix_neighbor_comments_post_created', NeighborComment.post_id, NeighborComment.created_at)
+
+
+class Counter(Base):
+    """Headline totals kept up to date in the same transaction as the write."""
+    __tablename__ = "counters"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class ImageVariant(Base):
+    """Resized WebP variants of an uploaded image, keyed by its public URL
+    (see app/images.py)."""
+    __tablename__ = "image_variants"
+    url = Column(String, primary_key=True)
+    thumb = Column(String, nullable=True)
+    medium = Column(String, nullable=True)
+    created_at = Column(DateTime, default=lambda: datetime.now(KST), nullable=False)
@@ -0,0 +1,142 @@
+"""Background refresh of popular upstream cache entries.
+
+``Namespace.fetch`` counts how often each key is asked for. Every
+``PREFETCH_INTERVAL`` seconds (jittered) the scheduler looks at the busiest
+keys of every namespace and reloads those about to expire, a random part of
+``lead`` before their TTL runs out, so popular screens (a city, today to +14
+days) keep hitting a warm cache instead of one user per TTL paying the
+upstream latency.
+
+Refreshes count against a per-provider budget (``PREFETCH_RATE_<NAME>``
+calls per minute, token bucket) and skip providers that are down or suspect;
+``Namespace.fetch`` already handles those. Demand decays by half every
+``PREFETCH_DECAY_EVERY`` seconds, so yesterday's hot keys cool off.
+
+Started/stopped from the app's startup/shutdown hooks; ``PREFETCH_ENABLED=0``
+turns it off.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+
+from . import cache
+
+INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "15"))
+TOP_KEYS = int(os.getenv("PREFETCH_TOP_KEYS", "20"))       # per namespace
+MIN_HITS = float(os.getenv("PREFETCH_MIN_HITS", "3"))      # decayed requests
+LEAD_FRACTION = 0.2                                        # of the TTL ...
+MAX_LEAD = 60.0                                            # ... up to this many seconds
+DECAY_EVERY = float(os.getenv("PREFETCH_DECAY_EVERY", "600"))
+DEFAULT_RATE = 30.0                                        # refreshes per minute per provider
+
+
+class _Bucket:
+    """Token bucket: ``rate`` tokens per minute, bursts up to ``rate``."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / 60.0)
+        self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+_buckets: dict[str, _Bucket] = {}
+_task: Optional[asyncio.Task] = None
+_stats = {"ticks": 0, "refreshed": 0, "failed": 0, "rate_limited": 0, "last_tick": None}
+
+
+def _bucket(provider: str) -> _Bucket:
+    bucket = _buckets.get(provider)
+    if bucket is None:
+        rate = os.getenv(f"PREFETCH_RATE_{provider.upper()}")
+        bucket = _buckets[provider] = _Bucket(float(rate) if rate else DEFAULT_RATE)
+    return bucket
+
+
+def _due(ns: cache.Namespace, key: str, now: float) -> bool:
+    lead = min(MAX_LEAD, ns.ttl * LEAD_FRACTION)
+    # jitter: each tick picks a point in the lead window, so workers and keys
+    # don't all refresh at the same moment
+    threshold = ns.ttl - lead * random.uniform(0.5, 1.0)
+    age = ns.age(key, now)
+    return age is None or age >= threshold
+
+
+async def tick(now: Optional[float] = None) -> int:
+    """Refresh the due popular keys once; returns how many were started."""
+    now = time.time() if now is None else now
+    jobs = []
+    for ns in cache.namespaces():
+        for demand in ns.hot(TOP_KEYS, MIN_HITS):
+            up = demand.upstream
+            if up.suspect(now) or not _due(ns, demand.key, now):
+                continue
+            if not _bucket(up.name).take():
+                _stats["rate_limited"] += 1
+                continue
+            jobs.append(ns.refresh(demand.key, demand.load, up))
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    ok = sum(1 for r in results if r is True)
+    _stats["refreshed"] += ok
+    _stats["failed"] += len(results) - ok
+    _stats["ticks"] += 1
+    _stats["last_tick"] = now
+    return len(jobs)
+
+
+async def _loop() -> None:
+    last_decay = time.monotonic()
+    while True:
+        await asyncio.sleep(INTERVAL * random.uniform(0.8, 1.2))
+        try:
+            await tick()
+        except Exception as exc:
+            print("WARN prefetch tick failed:", exc)
+        if time.monotonic() - last_decay >= DECAY_EVERY:
+            last_decay = time.monotonic()
+            for ns in cache.namespaces():
+                ns.decay(0.5)
+
+
+def _enabled() -> bool:
+    return os.getenv("PREFETCH_ENABLED", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def start() -> None:
+    """Start the scheduler. Call from startup."""
+    global _task
+    if _enabled() and _task is None:
+        _task = asyncio.get_running_loop().create_task(_loop())
+
+
+async def stop() -> None:
+    """Stop the scheduler. Call from shutdown."""
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+def status() -> dict:
+    return {
+        "running": _task is not None and not _task.done(),
+        "interval_s": INTERVAL,
+        **_stats,
+        "tokens": {name: round(b.tokens, 1) for name, b in sorted(_buckets.items())},
+    }
@@ -0,0 +1,28 @@
+"""orjson-backed JSON response for hot endpoints.
+
+Returning a Response directly skips FastAPI's response_model validation and
+``jsonable_encoder`` pass, so handlers hand over plain dicts/lists (built
+straight from query rows) and keep ``response_model`` only for OpenAPI.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    # fallback for the few call sites that still pass Pydantic models
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
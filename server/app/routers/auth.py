@@ -1,58 +1,105 @@
 """Authentication endpoints using SQLAlchemy models and JWT tokens."""
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
-from .. import models, schemas, security
+from .. import counters, models, schemas, security, warmup
 from ..database import get_db
-from ..deps import get_current_user_required
+from ..deps import Principal, get_principal_required
 
 router = APIRouter()
 
 
-@router.post("/register", response_model=schemas.TokenOut)
-def register(payload: schemas.RegisterIn, db: Session = Depends(get_db)):
-    email = payload.email.strip().lower()
-    if not email:
-        raise HTTPException(status_code=400, detail="Email is required")
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="잠시 후 다시 시도해 주세요.",
+        headers={"Retry-After": str(security.HASH_RETRY_AFTER)},
+    )
 
-    existing = db.query(models.User).filter(models.User.email == email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
 
-    display_name = payload.display_name or email.split("@")[0]
-    hashed_password = security.hash_password(payload.password)
+# register/login are async: the hash is awaited on the loop (it runs in the
+# hashing pool), and only the short DB calls below take a threadpool slot, so
+# a login burst can't use up the threadpool every sync endpoint shares.
+def _user_by_email(db: Session, email: str) -> Optional[models.User]:
+    return db.query(models.User).filter(models.User.email == email).first()
 
+
+def _create_user(db: Session, email: str, hashed_password: str, display_name: str) -> models.User:
     user = models.User(
         email=email,
         hashed_password=hashed_password,
         display_name=display_name,
     )
     db.add(user)
+    counters.add(db, counters.USERS)
     db.commit()
     db.refresh(user)
+    return user
+
+
+def _store_hash(db: Session, user: models.User, hashed_password: str) -> None:
+    user.hashed_password = hashed_password
+    db.commit()
+
+
+@router.post("/register", response_model=schemas.TokenOut)
+async def register(payload: schemas.RegisterIn, db: Session = Depends(get_db)):
+    email = payload.email.strip().lower()
+    if not email:
+        raise HTTPException(status_code=400, detail="Email is required")
+
+    existing = await run_in_threadpool(_user_by_email, db, email)
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    display_name = payload.display_name or email.split("@")[0]
+    try:
+        hashed_password = await security.hash_password_async(payload.password)
+    except security.HasherBusy:
+        raise _hasher_busy()
+
+    user = await run_in_threadpool(_create_user, db, email, hashed_password, display_name)
 
     token = security.create_access_token(str(user.id))
     return schemas.TokenOut(access_token=token)
 
 
 @router.post("/login", response_model=schemas.TokenOut)
-def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
+async def login(payload: schemas.LoginIn, db: Session = Depends(get_db)):
     email = payload.email.strip().lower()
-    user = db.query(models.User).filter(models.User.email == email).first()
-    if not user or not security.verify_password(payload.password, user.hashed_password):
+    user = await run_in_threadpool(_user_by_email, db, email)
+    ok, new_hash = False, None
+    if user:
+        try:
+            ok, new_hash = await security.verify_and_update_async(payload.password, user.hashed_password)
+        except security.HasherBusy:
+            raise _hasher_busy()
+    if not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="회원가입 정보가 없거나 입력이 잘못되었습니다.",
         )
+    if new_hash:
+        # 해시 비용(BCRYPT_ROUNDS)이 바뀐 경우 로그인 시점에 재해시
+        await run_in_threadpool(_store_hash, db, user, new_hash)
 
     token = security.create_access_token(str(user.id))
     return schemas.TokenOut(access_token=token)
 
 
 @router.get("/me", response_model=schemas.UserMe)
-def me(current_user: models.User = Depends(get_current_user_required)):
+def me(current_user: Principal = Depends(get_principal_required)):
     return schemas.UserMe(
         id=current_user.id,
         email=current_user.email,
         display_name=current_user.display_name,
     )
+
+
+@warmup.register("password_hasher", priority=0, budget=10.0)
+async def _warm_hasher() -> None:
+    # spawn the hashing pool now instead of on the first login after a deploy
+    await security.hash_password_async("warmup")
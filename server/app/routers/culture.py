@@ -1,93 +1,248 @@
-from fastapi import APIRouter, Query, Request, Response
-from typing import Optional
+from fastapi import APIRouter, Query, Request
+from typing import Iterator, NamedTuple, Optional
 from datetime import datetime, timedelta
-import math
+import asyncio
 import os
 import httpx
+import xmltodict
+
+from .. import cache, conditional, geo, warmup
 
 router = APIRouter()
 
-# simple in-memory cache with parameter key
-_cache: dict[str, dict] = {}
-_ts: dict[str, float] = {}
-_TTL = 300.0  # 5 minutes
+# Nearby results are assembled from a fixed tile grid (app/geo.py): each tile
+# is fetched once per date window and shared by every request that overlaps
+# it, then merged, filtered by true distance and sorted locally.
+# Expired tiles are kept a day longer and served (marked stale) while
+# culture.go.kr is failing; as the bulkiest entries they get a larger L1 budget.
+_tiles = cache.namespace("culture_tiles", ttl=600.0, stale_ttl=86400.0, max_bytes=32 * 1024 * 1024)
+_upstream = cache.upstream("culture")
+# /nearby 응답 본문: 인코딩·압축된 채로 보관 (CACHE_TTL_CULTURE)
+_responses = cache.namespace("culture", ttl=300.0)
+
+URL = "http://www.culture.go.kr/openapi/rest/publicperformancedisplays/period"
+MAX_TILES = 16          # finer tiles until a request would need more than this
+TILE_ROWS = 100         # items per upstream page
+TILE_MAX_PAGES = 5      # pages fetched per tile at most
+TILE_DAYS = 90          # default window fetched per tile; narrower ranges filter locally
+_fetch_slots = asyncio.Semaphore(6)  # concurrent upstream calls per worker
+
 
 def _today() -> str:
     return datetime.now().strftime("%Y%m%d")
 
-def _bbox_from_center(lat: float, lng: float, radius_km: float):
-    dlat = radius_km / 111.0
-    dlng = radius_km / (111.0 * max(math.cos(math.radians(lat)), 1e-6))
-    return (lng - dlng, lat - dlat, lng + dlng, lat + dlat)
+
+def _ymd(value) -> str:
+    return "".join(ch for ch in str(value or "") if ch.isdigit())[:8]
+
+
+def _extract_items(data) -> list[dict]:
+    """Item list from either the JSON (response.body.items.item) or the XML
+    (response.msgBody.perforList) form of the API."""
+    if not isinstance(data, dict):
+        return []
+    resp = data.get("response") or {}
+    items = ((resp.get("body") or {}).get("items") or {})
+    items = items.get("item") if isinstance(items, dict) else items
+    if items is None:
+        items = (resp.get("msgBody") or {}).get("perforList")
+    if isinstance(items, dict):
+        items = [items]
+    return [it for it in items or [] if isinstance(it, dict)]
+
+
+def item_coords(it: dict) -> tuple[Optional[float], Optional[float]]:
+    lat = geo.to_float(it.get("gpsY") or it.get("gpslatitude"))
+    lng = geo.to_float(it.get("gpsX") or it.get("gpslongitude"))
+    return lat, lng
+
+
+def _window(from_: str, to: str) -> tuple[str, str]:
+    today = _today()
+    default_to = (datetime.now() + timedelta(days=TILE_DAYS)).strftime("%Y%m%d")
+    if from_ >= today and to <= default_to:
+        return today, default_to
+    return from_, to
+
+
+class Nearby(NamedTuple):
+    items: list[dict]
+    stale: bool  # some tiles came from stale cache (upstream failing)
+    partial: bool = False  # some tiles failed with nothing cached: items are missing
+
+
+class Tiles(NamedTuple):
+    items: list[list[dict]]  # one list per tile that has data
+    stale: bool
+    missing: bool  # a tile failed upstream and had no stale copy
+
+
+async def _fetch_tile(service_key: str, tile: geo.Tile, win: tuple[str, str]) -> list[dict]:
+    b = tile.bbox
+    params = {
+        "from": win[0],
+        "to": win[1],
+        "cPage": 1,
+        "rows": TILE_ROWS,
+        "place": "",
+        "gpsxfrom": f"{b.west:.6f}",
+        "gpsyfrom": f"{b.south:.6f}",
+        "gpsxto": f"{b.east:.6f}",
+        "gpsyto": f"{b.north:.6f}",
+        "keyword": "",
+        "sortStdr": 1,
+        "serviceKey": service_key,
+    }
+    items: list[dict] = []
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        # dense tiles span several pages; stop at a short page
+        for page in range(1, TILE_MAX_PAGES + 1):
+            params["cPage"] = page
+            async with _fetch_slots:
+                r = await client.get(URL, params=params)
+            r.raise_for_status()
+            # culture API는 JSON/XML 둘 다 가능
+            if "application/json" in r.headers.get("content-type", ""):
+                data = r.json()
+            else:
+                data = xmltodict.parse(r.text)
+            batch = _extract_items(data)
+            items.extend(batch)
+            if len(batch) < TILE_ROWS:
+                break
+    return items
+
+
+async def _load_tiles(service_key: str, bbox: geo.BBox, win: tuple[str, str]) -> Tiles:
+    """Items of every tile covering ``bbox`` (clipped to Korea), whether any of
+    them is stale, and whether any is missing (neither fresh nor stale data)."""
+    bbox = geo.clip(bbox, geo.KOREA)
+    if bbox is None:
+        return Tiles([], False, False)
+    tiles = geo.tiles_for_bbox(bbox, MAX_TILES)
+    results = await asyncio.gather(*(
+        _tiles.fetch(f"{t.key}:{win[0]}:{win[1]}", lambda t=t: _fetch_tile(service_key, t, win), _upstream)
+        for t in tiles
+    ))
+    found = [r.value for r in results if r is not None]
+    return Tiles(found, any(r.stale for r in results if r is not None), len(found) < len(results))
+
+
+def _matching(tile_items: list[list[dict]], from_: str, to: str, keyword: str = "") -> Iterator[tuple[dict, float, float]]:
+    """Deduplicated items running within [from_, to] that have coordinates."""
+    seen: set = set()
+    for items in tile_items:
+        for it in items:
+            ident = it.get("seq") or (it.get("title"), it.get("place"), it.get("startDate"))
+            if ident in seen:
+                continue
+            seen.add(ident)
+            if keyword and keyword not in (it.get("title") or "") and keyword not in (it.get("place") or ""):
+                continue
+            start = _ymd(it.get("startDate")) or from_
+            end = _ymd(it.get("endDate")) or to
+            if start > to or end < from_:
+                continue
+            ilat, ilng = item_coords(it)
+            if ilat is not None and ilng is not None:
+                yield it, ilat, ilng
+
+
+def _dates(from_: Optional[str], to: Optional[str]) -> tuple[str, str]:
+    from_ = _ymd(from_) or _today()
+    to = _ymd(to) or (datetime.now() + timedelta(days=14)).strftime("%Y%m%d")
+    return from_, to
+
+
+async def fetch_nearby(
+    lat: float,
+    lng: float,
+    radiusKm: float = 5.0,
+    from_: Optional[str] = None,
+    to: Optional[str] = None,
+    keyword: str = "",
+) -> Optional[Nearby]:
+    """문화포털 공연/전시 within ``radiusKm``, nearest first (each item gets
+    ``distanceKm``). None when no key is configured; tiles that fail upstream
+    come from stale cache if possible and are left out otherwise (``partial``)."""
+    service_key = os.getenv("CULTURE_API_KEY")
+    if not service_key:
+        return None
+
+    from_, to = _dates(from_, to)
+    tiles = await _load_tiles(service_key, geo.bbox_from_center(lat, lng, radiusKm), _window(from_, to))
+    near: list[tuple[float, dict]] = []
+    for it, ilat, ilng in _matching(tiles.items, from_, to, keyword):
+        dist = geo.haversine_km(lat, lng, ilat, ilng)
+        if dist <= radiusKm:
+            near.append((dist, it))
+    near.sort(key=lambda pair: pair[0])
+    return Nearby([dict(it, distanceKm=round(dist, 3)) for dist, it in near], tiles.stale, tiles.missing)
+
+
+async def events_in_bbox(
+    bbox: geo.BBox, from_: Optional[str] = None, to: Optional[str] = None
+) -> list[tuple[dict, float, float]]:
+    """(item, lat, lng) for events inside ``bbox``, from the same tile cache."""
+    service_key = os.getenv("CULTURE_API_KEY")
+    if not service_key:
+        return []
+    from_, to = _dates(from_, to)
+    tiles = await _load_tiles(service_key, bbox, _window(from_, to))
+    return [m for m in _matching(tiles.items, from_, to) if geo.in_bbox(bbox, m[1], m[2])]
+
 
 @router.get("/nearby")
 async def culture_nearby(
     request: Request,
-    response: Response,
     lat: float = Query(...),
     lng: float = Query(...),
     radiusKm: float = Query(5.0, ge=0.5, le=50.0),
     from_: Optional[str] = Query(None, alias="from", description="YYYYMMDD"),
     to: Optional[str] = Query(None, description="YYYYMMDD"),
     keyword: str = Query("", description="optional keyword filter"),
+    limit: int = Query(50, ge=1, le=500, description="가까운 순으로 최대 몇 개"),
 ):
-    service_key = os.getenv("CULTURE_API_KEY")
-    if not service_key:
-        # 프론트 파서가 기대하는 구조로 빈 값 반환
-        return {"response": {"body": {"items": {"item": []}}}}
-
-    if not from_:
-        from_ = _today()
-    if not to:
-        to = (datetime.now() + timedelta(days=14)).strftime("%Y%m%d")
-
-    # cache key with rounded coordinates to increase hit rate
-    rlat = round(lat, 2)
-    rlng = round(lng, 2)
-    key = f"{rlat}:{rlng}:{radiusKm}:{from_}:{to}:{keyword}"
-    import time
-    now = time.time()
-    ts = _ts.get(key)
-    if ts and (now - ts) < _TTL:
-        etag = f'W/"cul-{int(ts)}"'
-        if request.headers.get("if-none-match") == etag:
-            return Response(status_code=304)
-        response.headers["ETag"] = etag
-        response.headers["Cache-Control"] = f"public, max-age={int(_TTL)}"
-        return _cache.get(key, {"response": {"body": {"items": {"item": []}}}})
-
-    xfrom, yfrom, xto, yto = _bbox_from_center(lat, lng, radiusKm)
-    params = {
-        "from": from_,
-        "to": to,
-        "cPage": 1,
-        "rows": 50,
-        "place": "",
-        "gpsxfrom": f"{xfrom:.6f}",
-        "gpsyfrom": f"{yfrom:.6f}",
-        "gpsxto": f"{xto:.6f}",
-        "gpsyto": f"{yto:.6f}",
-        "keyword": keyword or "",
-        "sortStdr": 1,
-        "serviceKey": service_key,
-    }
+    cache_control = f"public, max-age={int(_responses.ttl)}"
+    # ~10 m grid: nearby requests from the same spot share one encoded body
+    key = f"{round(lat, 4)}:{round(lng, 4)}:{radiusKm}:{_dates(from_, to)}:{keyword}:{limit}"
+    hit = _responses.get(key)
+    if hit and isinstance(hit.value, cache.CachedBody):
+        return conditional.send_cached(request, hit.value, cache_control)
 
-    url = "http://www.culture.go.kr/openapi/rest/publicperformancedisplays/period"
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(url, params=params)
-            r.raise_for_status()
-            # culture API는 JSON/XML 둘 다 가능 — 기본 JSON
-            ct = r.headers.get("content-type", "")
-            if "application/json" in ct:
-                data = r.json()
-            else:
-                data = r.text  # type: ignore
-            _cache[key] = data  # type: ignore[assignment]
-            _ts[key] = now
-            response.headers["ETag"] = f'W/"cul-{int(now)}"'
-            response.headers["Cache-Control"] = f"public, max-age={int(_TTL)}"
-            return data
-    except Exception:
-        # 네트워크 오류 시에도 실패 대신 빈 결과 반환
-        return {"response": {"body": {"items": {"item": []}}}}
+    found = await fetch_nearby(lat, lng, radiusKm, from_, to, keyword)
+    items = found.items if found else []
+    # 프론트 파서가 기대하는 구조(response.body.items.item)로 반환; totalCount는 자르기 전 개수
+    data = {"response": {"body": {"items": {"item": items[:limit]}, "totalCount": len(items)}}}
+    if found and found.partial:
+        # 일부 타일 실패(캐시도 없음): 빠진 결과를 보관/캐시하지 않음 → 복구되면 바로 다시 조회
+        data["partial"] = True
+        if found.stale:
+            data["stale"] = True
+        return conditional.conditional_json(request, data, cache_control="no-store")
+    if found and found.stale:
+        # 업스트림 장애 중: 만료된 캐시로 응답, 짧게만 캐시 (본문도 보관하지 않음)
+        data["stale"] = True
+        return conditional.conditional_json(request, data, cache_control="public, max-age=30")
+    if found is None:
+        return conditional.conditional_json(request, data, cache_control=cache_control)
+    entry = _responses.set(key, conditional.cached_body(data))
+    return conditional.send_cached(request, entry.value, cache_control)
+
+
+def _warm_points() -> list[tuple[float, float]]:
+    """``WARMUP_CULTURE_POINTS="lat,lng;lat,lng"`` (기본: 서울시청)."""
+    points = []
+    for part in os.getenv("WARMUP_CULTURE_POINTS", "37.5665,126.9780").split(";"):
+        try:
+            lat, lng = (float(v) for v in part.split(","))
+        except ValueError:
+            continue
+        points.append((lat, lng))
+    return points
+
+
+@warmup.register("culture.nearby", priority=50, budget=10.0)
+async def _warm_nearby() -> None:
+    # DiscoveryPanel의 첫 조회(반경 5km)가 덮는 타일들
+    await asyncio.gather(*(fetch_nearby(lat, lng, 5.0) for lat, lng in _warm_points()))
@@ -2,6 +2,8 @@ from fastapi import APIRouter
 from typing import List
 import os
 
+from .. import cache, prefetch
+
 router = APIRouter()
 
 
@@ -42,3 +44,9 @@ def diag():
             "trips_summary": has("/api/trips/summary"),
         },
     }
+
+
+@router.get("/cache")
+def cache_stats():
+    """Per-namespace hit/miss counters for this worker plus the shared backend."""
+    return {**cache.stats(), "prefetch": prefetch.status()}
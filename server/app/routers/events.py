@@ -0,0 +1,167 @@
+"""Unified "events near me": culture.go.kr and KOPIS in one compact list.
+
+Both providers are queried concurrently under one deadline. Whatever has
+arrived by then is normalized, deduplicated and returned; a provider that is
+still running is reported in ``timed_out`` and keeps going in the background,
+so its cache is warm for the next request. A provider answering from stale
+cache (upstream failing) is listed in ``stale``; one that failed with nothing
+cached, or (culture) is missing failed tiles, is listed in ``failed``.
+"""
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+
+from .. import conditional
+from ..kopis_parser import Performance
+from . import culture, kopis
+
+router = APIRouter()
+
+DEFAULT_DEADLINE = 3.0
+# a provider without its key configured returns None and is simply skipped
+_KEYS = {"culture": "CULTURE_API_KEY", "kopis": "KOPIS_API_KEY"}
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]+")
+# provider tasks that outlived a request's deadline (strong refs until done)
+_background: set[asyncio.Task] = set()
+
+
+def _forget(task: asyncio.Task) -> None:
+    _background.discard(task)
+    if not task.cancelled():
+        task.exception()  # mark retrieved; the provider already logged it
+
+
+def _iso(value) -> Optional[str]:
+    digits = "".join(ch for ch in str(value or "") if ch.isdigit())[:8]
+    return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}" if len(digits) == 8 else None
+
+
+def _from_culture(it: dict) -> dict:
+    lat, lng = culture.item_coords(it)
+    return {
+        "id": f"culture:{it.get('seq') or it.get('title')}",
+        "title": it.get("title"),
+        "venue": it.get("place"),
+        "lat": lat,
+        "lng": lng,
+        "start": _iso(it.get("startDate")),
+        "end": _iso(it.get("endDate")),
+        "image": it.get("thumbnail"),
+        "source": "culture",
+        "distanceKm": it.get("distanceKm"),
+    }
+
+
+def _from_kopis(p: Performance) -> dict:
+    return {
+        "id": f"kopis:{p.mt20id}",
+        "title": p.prfnm,
+        "venue": p.fcltynm,
+        "lat": None,
+        "lng": None,
+        "start": _iso(p.prfpdfrom),
+        "end": _iso(p.prfpdto),
+        "image": p.poster,
+        "source": "kopis",
+        "distanceKm": None,
+    }
+
+
+def _same_event(a: dict, b: dict) -> bool:
+    # periods overlap (missing dates don't rule a match out)
+    return (a["start"] or "") <= (b["end"] or "9") and (b["start"] or "") <= (a["end"] or "9")
+
+
+def merge(groups: list[list[dict]]) -> list[dict]:
+    """Drop listings of the same show from a later provider, keeping the
+    first (coordinates win) and borrowing fields it lacks (e.g. a poster)."""
+    by_title: dict[str, list[dict]] = {}
+    out: list[dict] = []
+    for events in groups:
+        for ev in events:
+            key = _NON_WORD.sub("", (ev["title"] or "").lower())
+            dup = next((o for o in by_title.get(key, []) if _same_event(o, ev)), None) if key else None
+            if dup is None:
+                out.append(ev)
+                if key:
+                    by_title.setdefault(key, []).append(ev)
+                continue
+            for field in ("venue", "image", "start", "end"):
+                if not dup[field] and ev[field]:
+                    dup[field] = ev[field]
+            if ev["source"] not in dup["source"].split("+"):
+                dup["source"] = f"{dup['source']}+{ev['source']}"
+    return out
+
+
+async def _kopis_near(lat: float, lng: float, from_: str, to: str) -> Optional[kopis.Page]:
+    # KOPIS 목록엔 좌표가 없어 시/도 단위로 조회
+    return await kopis.fetch_page(kopis.nearest_sido(lat, lng), from_, to, rows=50)
+
+
+@router.get("/nearby")
+async def events_nearby(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radiusKm: float = Query(5.0, ge=0.5, le=50.0),
+    from_: Optional[str] = Query(None, alias="from", description="YYYYMMDD"),
+    to: Optional[str] = Query(None, description="YYYYMMDD"),
+    sort: str = Query("distance", pattern="^(distance|date)$"),
+    limit: int = Query(50, ge=1, le=200),
+    deadline: float = Query(DEFAULT_DEADLINE, gt=0, le=10.0, description="seconds"),
+):
+    from_ = from_ or datetime.now().strftime("%Y%m%d")
+    to = to or (datetime.now() + timedelta(days=14)).strftime("%Y%m%d")
+
+    tasks = {
+        "culture": asyncio.ensure_future(culture.fetch_nearby(lat, lng, radiusKm, from_, to)),
+        "kopis": asyncio.ensure_future(_kopis_near(lat, lng, from_, to)),
+    }
+    await asyncio.wait(tasks.values(), timeout=deadline)
+
+    groups: list[list[dict]] = []
+    timed_out: list[str] = []
+    failed: list[str] = []
+    stale: list[str] = []
+    convert = {"culture": _from_culture, "kopis": _from_kopis}
+    for name, task in tasks.items():
+        if not task.done():
+            timed_out.append(name)
+            _background.add(task)
+            task.add_done_callback(_forget)
+        elif task.exception() is not None:
+            failed.append(name)
+        elif task.result() is None:
+            # upstream down and nothing cached (fetchers return None, not raise)
+            if os.getenv(_KEYS[name]):
+                failed.append(name)
+        else:
+            # culture.Nearby(items, stale, partial) / kopis.Page(records, stale)
+            result = task.result()
+            groups.append([convert[name](it) for it in result[0]])
+            if result.stale:
+                stale.append(name)
+            if getattr(result, "partial", False):
+                failed.append(name)
+
+    events = merge(groups)
+    if sort == "date":
+        events.sort(key=lambda e: (e["start"] or "9999", e["distanceKm"] if e["distanceKm"] is not None else float("inf")))
+    else:
+        events.sort(key=lambda e: (e["distanceKm"] is None, e["distanceKm"] or 0.0, e["start"] or "9999"))
+
+    data = {
+        "items": events[:limit],
+        "total": len(events),
+        "partial": bool(timed_out or failed),
+        "timed_out": timed_out,
+        "failed": failed,
+        "stale": stale,
+    }
+    cache_control = "no-store" if data["partial"] or stale else "public, max-age=300"
+    return conditional.conditional_json(request, data, cache_control=cache_control)
@@ -1,16 +1,47 @@
-from fastapi import APIRouter, Query, Request, Response
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import NamedTuple, Optional
 from datetime import datetime, timedelta
+import asyncio
 import os
+import re
 import httpx
 import xmltodict
 
+from .. import cache, conditional, geo, kopis_parser, warmup
+from ..kopis_parser import Performance
+
 router = APIRouter()
 
-# simple in-memory cache
-_cache: dict[str, dict] = {}
-_ts: dict[str, float] = {}
-_TTL = 300.0
+# list pages as compact rows (kopis_parser.Performance), shared across workers.
+# Expired entries are kept a day longer and served (marked stale) while KOPIS
+# is failing.
+_cache = cache.namespace("kopis_pages", ttl=300.0, stale_ttl=86400.0)
+# opt-in raw xmltodict trees (raw=1)
+_raw_cache = cache.namespace("kopis_raw", ttl=300.0, stale_ttl=86400.0)
+# 공연 상세는 거의 바뀌지 않음
+_detail_cache = cache.namespace(
+    "kopis_detail", ttl=float(os.getenv("KOPIS_DETAIL_TTL", "86400")), stale_ttl=7 * 86400.0, max_entries=5000
+)
+# ids KOPIS answered without a performance: not asked again for a while
+_detail_missing = cache.namespace(
+    "kopis_detail_missing", ttl=float(os.getenv("KOPIS_DETAIL_MISSING_TTL", "600")), max_entries=5000
+)
+_upstream = cache.upstream("kopis")
+
+LIST_URL = "http://www.kopis.or.kr/openApi/restful/pblprfr"
+
+# pages=N 모드: 요청당 최대 페이지 수, 동시에 가져올 페이지 수
+MAX_PAGES = int(os.getenv("KOPIS_MAX_PAGES", "10"))
+PAGE_CONCURRENCY = int(os.getenv("KOPIS_PAGE_CONCURRENCY", "4"))
+
+# responses built from expired cache (or missing pages) while KOPIS is failing
+STALE_CACHE_CONTROL = "public, max-age=30"
+RETRY_AFTER = 30  # seconds, for 503s while KOPIS is down and nothing is cached
+
+# /detail: ids per request, concurrent detail calls per worker
+MAX_DETAIL_IDS = 50
+_detail_slots = asyncio.Semaphore(int(os.getenv("KOPIS_DETAIL_CONCURRENCY", "6")))
+_ID = re.compile(r"^[A-Za-z0-9]{1,20}$")
 
 SIDO_CODE = {
     "서울특별시": "11",
@@ -32,68 +63,269 @@ SIDO_CODE = {
     "제주특별자치도": "50",
 }
 
+# 시/도 대표 좌표(청사 기준). 좌표만 있는 요청의 시/도를 고를 때 쓰는 근사치
+SIDO_CENTER = {
+    "서울특별시": (37.5665, 126.9780),
+    "부산광역시": (35.1796, 129.0756),
+    "대구광역시": (35.8714, 128.6014),
+    "인천광역시": (37.4563, 126.7052),
+    "광주광역시": (35.1595, 126.8526),
+    "대전광역시": (36.3504, 127.3845),
+    "울산광역시": (35.5384, 129.3114),
+    "세종특별자치시": (36.4800, 127.2890),
+    "경기도": (37.2752, 127.0095),
+    "강원도": (37.8854, 127.7298),
+    "충청북도": (36.6357, 127.4917),
+    "충청남도": (36.6588, 126.6728),
+    "전라북도": (35.8202, 127.1089),
+    "전라남도": (34.8161, 126.4629),
+    "경상북도": (36.5760, 128.5056),
+    "경상남도": (35.2383, 128.6925),
+    "제주특별자치도": (33.4890, 126.4983),
+}
+
+
+def nearest_sido(lat: float, lng: float) -> str:
+    return min(SIDO_CENTER, key=lambda name: geo.haversine_km(lat, lng, *SIDO_CENTER[name]))
+
+
 def _today() -> str:
     return datetime.now().strftime("%Y%m%d")
 
+def _params(city: str, from_: str, to: str, rows: int, page: int, gugun_code: str) -> dict:
+    params = {
+        "service": os.getenv("KOPIS_API_KEY"),
+        "stdate": from_,
+        "eddate": to,
+        "rows": rows,
+        "cpage": page,
+    }
+    if city and city in SIDO_CODE:
+        params["signgucode"] = SIDO_CODE[city]
+    if gugun_code:
+        params["signgucodesub"] = gugun_code
+    return params
+
+
+def _window(from_: Optional[str], to: Optional[str]) -> tuple[str, str]:
+    return from_ or _today(), to or (datetime.now() + timedelta(days=14)).strftime("%Y%m%d")
+
+
+async def _get(params: dict) -> bytes:
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        r = await client.get(LIST_URL, params=params)
+        r.raise_for_status()
+        return r.content
+
+
+class Page(NamedTuple):
+    records: list[Performance]
+    stale: bool  # served from expired cache because KOPIS is failing
+
+
+async def fetch_page(
+    city: str = "",
+    from_: Optional[str] = None,
+    to: Optional[str] = None,
+    rows: int = 30,
+    page: int = 1,
+    gugun_code: str = "",
+) -> Optional[Page]:
+    """Cached KOPIS 공연 목록 한 페이지. None when no key, or when upstream
+    fails and there is nothing cached to fall back on."""
+    if not os.getenv("KOPIS_API_KEY"):
+        return None
+    from_, to = _window(from_, to)
+
+    async def load() -> list[tuple]:
+        content = await _get(_params(city, from_, to, rows, page, gugun_code))
+        return [tuple(r) for r in kopis_parser.parse_performances(content)]
+
+    found = await _cache.fetch(f"{city}:{from_}:{to}:{rows}:{page}:{gugun_code}", load, _upstream)
+    if found is None:
+        return None
+    return Page(kopis_parser.from_rows(found.value), found.stale)
+
+
+async def fetch_pages(
+    city: str = "",
+    from_: Optional[str] = None,
+    to: Optional[str] = None,
+    rows: int = 30,
+    first: int = 1,
+    budget: int = MAX_PAGES,
+    gugun_code: str = "",
+) -> tuple[Optional[Page], int, bool]:
+    """Pages ``first``.. up to ``budget``, merged and deduplicated by mt20id.
+
+    Pages are fetched ``PAGE_CONCURRENCY`` at a time (each one cached like a
+    single-page request); a short or failed page ends the listing. Returns
+    ``(page, pages_fetched, complete)``; page is None only when the first
+    page could not be fetched, and stale if any of its parts was.
+    """
+    pages: list[Optional[Page]] = []
+    done = False
+    last = first + budget
+    while not done and first + len(pages) < last:
+        start = first + len(pages)
+        wave = range(start, min(start + PAGE_CONCURRENCY, last))
+        results = await asyncio.gather(*(fetch_page(city, from_, to, rows, p, gugun_code) for p in wave))
+        for result in results:
+            pages.append(result)
+            if result is None or len(result.records) < rows:
+                done = True
+                break
+
+    if not pages or pages[0] is None:
+        return None, 0, False
+    seen: set = set()
+    merged: list[Performance] = []
+    for part in pages:
+        for r in part.records if part else []:
+            if r.mt20id in seen:
+                continue  # 페이지 경계에서 목록이 밀리면 같은 공연이 다시 나옴
+            seen.add(r.mt20id)
+            merged.append(r)
+    # a failed page in the middle leaves the listing incomplete
+    complete = done and pages[-1] is not None
+    return Page(merged, any(p.stale for p in pages if p)), len(pages), complete
+
+
+async def fetch_raw(
+    city: str, from_: Optional[str], to: Optional[str], rows: int, page: int, gugun_code: str
+) -> Optional[cache.Fetched]:
+    """Full xmltodict tree of one page (opt-in ``raw=1``) as a ``CachedBody``,
+    cached separately."""
+    if not os.getenv("KOPIS_API_KEY"):
+        return None
+    from_, to = _window(from_, to)
+
+    async def load() -> cache.CachedBody:
+        content = await _get(_params(city, from_, to, rows, page, gugun_code))
+        return conditional.cached_body(xmltodict.parse(content))
+
+    return await _raw_cache.fetch(f"{city}:{from_}:{to}:{rows}:{page}:{gugun_code}", load, _upstream)
+
+
+def _unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="KOPIS unavailable",
+        headers={"Retry-After": str(RETRY_AFTER)},
+    )
+
+
 @router.get("/perform")
 async def perform(
     request: Request,
-    response: Response,
     city: str = Query("", description="예: 광주광역시 / 서울특별시"),
     from_: Optional[str] = Query(None, alias="from", description="YYYYMMDD"),
     to: Optional[str] = Query(None, description="YYYYMMDD"),
     rows: int = Query(30, ge=1, le=200),
     page: int = Query(1, ge=1),
     gugun_code: str = Query("", description="KOPIS 구군 코드(선택)"),
+    pages: int = Query(1, ge=1, le=MAX_PAGES, description="page부터 최대 몇 페이지를 한 번에 모을지"),
+    raw: bool = Query(False, description="KOPIS 원본 트리(xmltodict) 그대로 반환"),
 ):
-    service_key = os.getenv("KOPIS_API_KEY")
-    if not service_key:
-        # 프론트 파서가 기대하는 구조로 빈 값 반환
-        return {"dbs": {"db": []}}
+    cache_control = f"public, max-age={int(_cache.ttl)}"
+    if raw:
+        found = await fetch_raw(city, from_, to, rows, page, gugun_code)
+        if found is None:
+            if os.getenv("KOPIS_API_KEY"):
+                raise _unavailable()
+            return {"dbs": {"db": []}}
+        response = conditional.send_cached(request, found.value, STALE_CACHE_CONTROL if found.stale else cache_control)
+        if found.stale:
+            response.headers["X-Cache-Stale"] = "1"
+        return response
 
-    if not from_:
-        from_ = _today()
-    if not to:
-        to = (datetime.now() + timedelta(days=14)).strftime("%Y%m%d")
+    if pages > 1:
+        result, fetched, complete = await fetch_pages(city, from_, to, rows, page, pages, gugun_code)
+        if result is None and os.getenv("KOPIS_API_KEY"):
+            raise _unavailable()
+        data = {
+            "dbs": {"db": kopis_parser.as_dicts(result.records if result else [])},
+            "pages": fetched,
+            # False: budget ran out (or a page failed) before a short page
+            "complete": complete,
+        }
+        if not complete:
+            # 뒤 페이지가 빠졌을 수 있음: 짧게만 캐시
+            cache_control = STALE_CACHE_CONTROL
+    else:
+        result = await fetch_page(city, from_, to, rows, page, gugun_code)
+        if result is None and os.getenv("KOPIS_API_KEY"):
+            raise _unavailable()
+        # 프론트 파서가 기대하는 구조(dbs.db), 필드는 앱이 쓰는 것만
+        data = {"dbs": {"db": kopis_parser.as_dicts(result.records if result else [])}}
+    if result and result.stale:
+        data["stale"] = True
+        cache_control = STALE_CACHE_CONTROL
+    return conditional.conditional_json(request, data, cache_control=cache_control)
 
-    params = {
-        "service": service_key,
-        "stdate": from_,
-        "eddate": to,
-        "rows": rows,
-        "cpage": page,
+
+async def _fetch_detail(mt20id: str, client: Optional[httpx.AsyncClient] = None) -> Optional[dict]:
+    if client is None or client.is_closed:
+        # prefetch refreshes run after the batch's shared client is closed
+        async with httpx.AsyncClient(timeout=10.0) as own:
+            return await _fetch_detail(mt20id, own)
+    async with _detail_slots:
+        r = await client.get(f"{LIST_URL}/{mt20id}", params={"service": os.getenv("KOPIS_API_KEY")})
+        r.raise_for_status()
+    found = kopis_parser.parse_detail(r.content)
+    if found is None:
+        _detail_missing.set(mt20id, True)
+    return found
+
+
+async def fetch_details(ids: list[str]) -> tuple[dict[str, dict], bool]:
+    """Details by mt20id and whether any came from stale cache. Uncached ids
+    are fetched concurrently (at most ``KOPIS_DETAIL_CONCURRENCY`` in flight
+    per worker over one shared client); ids that fail or don't exist are left
+    out, and unknown ids are remembered for ``KOPIS_DETAIL_MISSING_TTL``."""
+    if not os.getenv("KOPIS_API_KEY"):
+        return {}, False
+    ids = [mt20id for mt20id in ids if _detail_missing.get(mt20id) is None]
+    async with httpx.AsyncClient(timeout=10.0) as client:
+        results = await asyncio.gather(*(
+            _detail_cache.fetch(mt20id, lambda mt20id=mt20id: _fetch_detail(mt20id, client), _upstream)
+            for mt20id in ids
+        ))
+    found = {mt20id: r.value for mt20id, r in zip(ids, results) if r is not None}
+    return found, any(r.stale for r in results if r is not None)
+
+
+@router.get("/detail")
+async def detail(
+    request: Request,
+    ids: str = Query(..., description="KOPIS 공연 ID(mt20id) 콤마 구분, 최대 50개"),
+):
+    wanted = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not wanted:
+        raise HTTPException(status_code=400, detail="ids is required")
+    if len(wanted) > MAX_DETAIL_IDS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_DETAIL_IDS} ids")
+    if any(not _ID.match(i) for i in wanted):
+        raise HTTPException(status_code=400, detail="invalid id")
+
+    found, stale = await fetch_details(wanted)
+    data = {
+        "items": [found[i] for i in wanted if i in found],
+        "missing": [i for i in wanted if i not in found],
     }
-    if city and city in SIDO_CODE:
-        params["signgucode"] = SIDO_CODE[city]
-    if gugun_code:
-        params["signgucodesub"] = gugun_code
+    # 일부가 빠지거나 만료된 응답은 오래 캐시하지 않음
+    cache_control = "public, max-age=3600" if not data["missing"] else "public, max-age=60"
+    if stale:
+        data["stale"] = True
+        cache_control = STALE_CACHE_CONTROL
+    return conditional.conditional_json(request, data, cache_control=cache_control)
+
+
+# DiscoveryPanel의 기본 조회(시/도, 오늘~30일, 50건)를 미리 채움
+_WARM_CITIES = [c.strip() for c in os.getenv("WARMUP_KOPIS_CITIES", "서울특별시").split(",") if c.strip()]
+
 
-    key = f"{city}:{from_}:{to}:{rows}:{page}:{gugun_code}"
-    import time
-    now = time.time()
-    ts = _ts.get(key)
-    if ts and (now - ts) < _TTL:
-        etag = f'W/"kop-{int(ts)}"'
-        if request.headers.get("if-none-match") == etag:
-            return Response(status_code=304)
-        response.headers["ETag"] = etag
-        response.headers["Cache-Control"] = f"public, max-age={int(_TTL)}"
-        return _cache.get(key, {"dbs": {"db": []}})
-
-    url = "http://www.kopis.or.kr/openApi/restful/pblprfr"
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            r = await client.get(url, params=params)
-            r.raise_for_status()
-            txt = r.text
-            try:
-                data = xmltodict.parse(txt)
-            except Exception:
-                data = {"dbs": {"db": []}}
-            _cache[key] = data  # type: ignore[assignment]
-            _ts[key] = now
-            response.headers["ETag"] = f'W/"kop-{int(now)}"'
-            response.headers["Cache-Control"] = f"public, max-age={int(_TTL)}"
-            return data
-    except Exception:
-        return {"dbs": {"db": []}}
+@warmup.register("kopis.perform", priority=50, budget=10.0)
+async def _warm_perform() -> None:
+    to = (datetime.now() + timedelta(days=30)).strftime("%Y%m%d")
+    await asyncio.gather(*(fetch_page(city, _today(), to, rows=50) for city in _WARM_CITIES))
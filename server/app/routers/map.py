@@ -0,0 +1,122 @@
+"""Server-side marker clustering for the map views.
+
+``GET /api/map/clusters`` groups cultural events (culture tile cache) and the
+user's trip stops into screen-space grid cells, so a city-wide view returns a
+few dozen clusters instead of every marker. Single-member cells, and every
+cell once the map is zoomed in far enough, come back as individual points.
+"""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from .. import conditional, geo
+from . import culture, trips
+
+router = APIRouter()
+
+CELL_PX = 60        # cluster cell edge on screen
+MAX_CELLS = 400     # coarser grid if a bbox/zoom combination would need more
+EXPAND_ZOOM = 16    # from here on, points instead of clusters ...
+MAX_POINTS = 500    # ... unless the view holds more than this
+LAYERS = ("events", "stops")
+
+
+def _event_point(item: dict, lat: float, lng: float) -> dict:
+    return {
+        "type": "point",
+        "kind": "event",
+        "id": item.get("seq") or item.get("title"),
+        "title": item.get("title"),
+        "place": item.get("place"),
+        "lat": lat,
+        "lng": lng,
+    }
+
+
+def _stop_point(stop: dict) -> dict:
+    return {
+        "type": "point",
+        "kind": "stop",
+        "id": stop["id"],
+        "trip_id": stop["trip_id"],
+        "title": stop["title"],
+        "place": stop["place"],
+        "status": stop["status"],
+        "lat": stop["lat"],
+        "lng": stop["lng"],
+    }
+
+
+def _cluster(points: list[dict]) -> dict:
+    lats = [p["lat"] for p in points]
+    lngs = [p["lng"] for p in points]
+    kinds: dict[str, int] = {}
+    for p in points:
+        kinds[p["kind"]] = kinds.get(p["kind"], 0) + 1
+    return {
+        "type": "cluster",
+        "count": len(points),
+        "lat": round(sum(lats) / len(lats), 6),
+        "lng": round(sum(lngs) / len(lngs), 6),
+        "kinds": kinds,
+        # zoom-to-fit target when the cluster is tapped
+        "bbox": [min(lngs), min(lats), max(lngs), max(lats)],
+    }
+
+
+@router.get("/clusters")
+async def clusters(
+    request: Request,
+    west: float = Query(..., ge=-180, le=180),
+    south: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="Web Mercator zoom"),
+    level: Optional[int] = Query(None, ge=1, le=14, description="Kakao 지도 레벨 (zoom ≈ 20 - level)"),
+    layers: str = Query("events,stops", description="events, stops 중 콤마 구분"),
+    from_: Optional[str] = Query(None, alias="from", description="YYYYMMDD"),
+    to: Optional[str] = Query(None, description="YYYYMMDD"),
+):
+    if zoom is None and level is None:
+        raise HTTPException(status_code=400, detail="zoom or level is required")
+    if west > east or south > north:
+        raise HTTPException(status_code=400, detail="invalid bbox")
+    if zoom is None:
+        zoom = max(0, 20 - level)
+    wanted = {name.strip() for name in layers.split(",")} & set(LAYERS)
+    bbox = geo.BBox(west, south, east, north)
+
+    jobs = []
+    if "events" in wanted:
+        # 조회 영역은 한국으로 잘라서 타일 수가 항상 제한됨(geo.MAX_TILES_CAP)
+        jobs.append(culture.events_in_bbox(bbox, from_, to))
+    if "stops" in wanted:
+        jobs.append(asyncio.to_thread(trips.stops_in_bbox, west, south, east, north))
+    try:
+        results = await asyncio.gather(*jobs)
+    except geo.TooManyTiles:
+        raise HTTPException(status_code=400, detail="bbox too large")
+
+    points: list[dict] = []
+    for name, found in zip([n for n in LAYERS if n in wanted], results):
+        if name == "events":
+            points.extend(_event_point(it, lat, lng) for it, lat, lng in found)
+        else:
+            points.extend(_stop_point(stop) for stop in found)
+
+    grid_zoom = zoom
+    while grid_zoom > 0 and geo.grid_cells(bbox, grid_zoom, CELL_PX) > MAX_CELLS:
+        grid_zoom -= 1
+
+    features: list[dict] = []
+    if zoom >= EXPAND_ZOOM and len(points) <= MAX_POINTS:
+        features = points
+    else:
+        for cell in geo.grid_cluster(points, lambda p: (p["lat"], p["lng"]), grid_zoom, CELL_PX):
+            features.extend(cell if len(cell) == 1 else [_cluster(cell)])
+
+    # stops are per user: keep the response out of shared caches
+    cache_control = conditional.PRIVATE_REVALIDATE if "stops" in wanted else "public, max-age=300"
+    data = {"zoom": zoom, "grid_zoom": grid_zoom, "total": len(points), "features": features}
+    return conditional.conditional_json(request, data, cache_control=cache_control)
@@ -1,13 +1,16 @@
 """Neighbor posts endpoints backed by SQLAlchemy models."""
 import json
-from typing import List
+import time
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from sqlalchemy import and_, case, func, or_, select, update
 from sqlalchemy.orm import Session, joinedload, load_only
 
-from .. import models, schemas
-from ..database import get_db
-from ..deps import get_current_user_required
+from .. import cache, conditional, content, counters, images, models, schemas, search, warmup
+from ..database import SessionLocal, get_db
+from ..deps import Principal, get_principal_required
+from ..responses import FastJSONResponse
 
 from fastapi import Body
 
@@ -16,10 +19,27 @@ KST = timezone(timedelta(hours=9))
 
 router = APIRouter()
 
-# in-process cache for summaries (by limit)
-_summary_cache: dict[int, list[schemas.PostSummary]] = {}
-_summary_ts: dict[int, float] = {}
-_SUMMARY_TTL = 30.0  # seconds
+# summary cache keyed by (feed version, limit), shared across workers.
+# Writes bump the feed version so stale entries are never served; the TTL is
+# only a backstop in case a write path forgets to bump.
+_summary_cache = cache.namespace("neighbor_summary", ttl=600.0)
+
+
+def _bump_feed_version() -> None:
+    _summary_cache.bump_version()
+
+
+def _summary_etag(limit: int, version: int) -> str:
+    return f'W/"sum-{limit}-{version}"'
+
+
+def _store_summary(version: int, limit: int, rows: list[dict], now: float) -> cache.CachedBody:
+    """Cache the encoded, compressed summary under the feed version read
+    *before* querying, so a write that lands mid-query can't get its stale
+    rows tagged as current."""
+    body = conditional.cached_body(rows, etag=_summary_etag(limit, version))
+    _summary_cache.set(f"{version}:{limit}", body, now)
+    return body
 
 
 def _serialize_images(value: str | None) -> List[str] | None:
@@ -53,36 +73,17 @@ def _post_to_summary(post: models.NeighborPost) -> schemas.PostSummary:
         title=post.title,
         cover=post.cover,
         date=post.created_at,
+        comment_count=post.comment_count or 0,
+        last_commented_at=post.last_commented_at,
+        excerpt=post.excerpt,
+        word_count=post.word_count or 0,
+        primary_image=post.primary_image,
     )
 
 
-@router.get("", response_model=List[schemas.PostOut])
-def list_posts(db: Session = Depends(get_db)):
-    posts = (
-        db.query(models.NeighborPost)
-        .order_by(models.NeighborPost.created_at.desc())
-        .all()
-    )
-    return [_post_to_schema(post) for post in posts]
-
-
-@router.get("/summary", response_model=List[schemas.PostSummary])
-def list_posts_summary(limit: int = 30, request: Request = None, response: Response = None, db: Session = Depends(get_db)):
-    safe_limit = max(1, min(limit, 100))
-    import time
-    now = time.time()
-    ts = _summary_ts.get(safe_limit)
-    if ts and (now - ts) < _SUMMARY_TTL:
-        rows = _summary_cache.get(safe_limit, [])
-        # ETag composed from limit + ts + rows length
-        etag = f'W/"sum-{safe_limit}-{int(ts)}-{len(rows)}"'
-        if request is not None and request.headers.get("if-none-match") == etag:
-            return Response(status_code=304)
-        if response is not None:
-            response.headers["ETag"] = etag
-            response.headers["Cache-Control"] = f"public, max-age={int(_SUMMARY_TTL)}"
-        return rows
-    posts = (
+def _summary_query(db: Session):
+    """Newest-first posts loading only the columns PostSummary needs."""
+    return (
         db.query(models.NeighborPost)
         .options(
             load_only(
@@ -90,62 +91,172 @@ def list_posts_summary(limit: int = 30, request: Request = None, response: Respo
                 models.NeighborPost.title,
                 models.NeighborPost.cover,
                 models.NeighborPost.created_at,
+                models.NeighborPost.comment_count,
+                models.NeighborPost.last_commented_at,
+                models.NeighborPost.excerpt,
+                models.NeighborPost.word_count,
+                models.NeighborPost.primary_image,
             ),
             joinedload(models.NeighborPost.author).load_only(models.User.display_name),
         )
         .order_by(models.NeighborPost.created_at.desc())
-        .limit(safe_limit)
+    )
+
+
+# PostSummary fields in schema order, selected as plain columns
+_SUMMARY_COLUMNS = (
+    models.NeighborPost.id,
+    models.User.display_name,
+    models.NeighborPost.title,
+    models.NeighborPost.cover,
+    models.NeighborPost.created_at,
+    models.NeighborPost.comment_count,
+    models.NeighborPost.last_commented_at,
+    models.NeighborPost.excerpt,
+    models.NeighborPost.word_count,
+    models.NeighborPost.primary_image,
+)
+
+
+def _summary_rows(db: Session, *, limit: Optional[int] = None, user_id: Optional[int] = None) -> list[dict]:
+    """PostSummary-shaped dicts straight from row tuples (no ORM objects,
+    no per-row Pydantic model); pair with FastJSONResponse."""
+    stmt = (
+        select(*_SUMMARY_COLUMNS)
+        .outerjoin(models.User, models.User.id == models.NeighborPost.user_id)
+        .order_by(models.NeighborPost.created_at.desc())
+    )
+    if user_id is not None:
+        stmt = stmt.where(models.NeighborPost.user_id == user_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = db.execute(stmt).all()
+    thumbs = images.thumbs(db, (r[3] for r in rows))
+    return [
+        {
+            "id": r[0],
+            "author": r[1] or "익명",
+            "title": r[2],
+            "cover": r[3],
+            "date": r[4],
+            "comment_count": r[5] or 0,
+            "last_commented_at": r[6],
+            "excerpt": r[7],
+            "word_count": r[8] or 0,
+            "primary_image": r[9],
+            "cover_thumb": thumbs.get(r[3]),
+        }
+        for r in rows
+    ]
+
+
+def _comment_cursor(comment: models.NeighborComment) -> str:
+    return f"{comment.created_at.isoformat()},{comment.id}"
+
+
+def _parse_comment_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        ts, cid = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(ts), int(cid)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("", response_model=List[schemas.PostOut])
+def list_posts(db: Session = Depends(get_db)):
+    posts = (
+        db.query(models.NeighborPost)
+        .order_by(models.NeighborPost.created_at.desc())
         .all()
     )
-    rows = [_post_to_summary(post) for post in posts]
-    _summary_cache[safe_limit] = rows
-    _summary_ts[safe_limit] = now
-    if response is not None:
-        etag = f'W/"sum-{safe_limit}-{int(now)}-{len(rows)}"'
-        response.headers["ETag"] = etag
-        response.headers["Cache-Control"] = f"public, max-age={int(_SUMMARY_TTL)}"
-    return rows
+    return [_post_to_schema(post) for post in posts]
+
+
+@router.get("/summary", response_model=List[schemas.PostSummary])
+def list_posts_summary(request: Request, limit: int = 30, db: Session = Depends(get_db)):
+    safe_limit = max(1, min(limit, 100))
+    now = time.time()
+    version = _summary_cache.version()
+    cache_control = "public, no-cache"
+    # the ETag is derived from the version, so a revalidation needs no lookup
+    etag = _summary_etag(safe_limit, version)
+    if conditional.etag_matches(request, etag):
+        return conditional.not_modified(etag, cache_control)
+    hit = _summary_cache.get(f"{version}:{safe_limit}", now)
+    if hit and isinstance(hit.value, cache.CachedBody):
+        return conditional.send_cached(request, hit.value, cache_control)
+    body = _store_summary(version, safe_limit, _summary_rows(db, limit=safe_limit), now)
+    return conditional.send_cached(request, body, cache_control)
+
+
+@warmup.register("neighbor_summary", priority=10, budget=5.0)
+def _warm_summary() -> None:
+    # the feed's default page; skipped when another worker already built it
+    version = _summary_cache.version()
+    if _summary_cache.get(f"{version}:30"):
+        return
+    db = SessionLocal()
+    try:
+        _store_summary(version, 30, _summary_rows(db, limit=30), time.time())
+    finally:
+        db.close()
 
 
 @router.get("/mine", response_model=List[schemas.PostSummary])
 def list_my_posts(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     """현재 로그인 사용자의 글 요약만 반환.
     배포 환경에 따라 마이페이지가 안전하게 내 글만 볼 수 있도록 분리 제공.
     """
-    posts = (
-        db.query(models.NeighborPost)
-        .options(
-            load_only(
-                models.NeighborPost.id,
-                models.NeighborPost.title,
-                models.NeighborPost.cover,
-                models.NeighborPost.created_at,
-            ),
-            joinedload(models.NeighborPost.author).load_only(models.User.display_name),
-        )
-        .filter(models.NeighborPost.user_id == current_user.id)
-        .order_by(models.NeighborPost.created_at.desc())
-        .all()
-    )
-    return [_post_to_summary(post) for post in posts]
+    return FastJSONResponse(_summary_rows(db, user_id=current_user.id))
+
+
+@router.get("/search", response_model=schemas.PostSearchPage)
+def search_posts(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0, le=1000),
+    db: Session = Depends(get_db),
+):
+    """제목/본문 전문 검색 (관련도순, 하이라이트 스니펫 포함)"""
+    hits = search.search(db, q, limit + 1, offset)
+    next_offset = offset + limit if len(hits) > limit else None
+    hits = hits[:limit]
+    if not hits:
+        return schemas.PostSearchPage(items=[], next_offset=None)
+    posts = {
+        p.id: p
+        for p in _summary_query(db).filter(models.NeighborPost.id.in_([h.post_id for h in hits])).all()
+    }
+    items = []
+    for h in hits:
+        post = posts.get(h.post_id)
+        if post is None:
+            continue
+        summary = _post_to_summary(post)
+        items.append(schemas.PostSearchHit(**summary.model_dump(), snippet=h.snippet, score=h.score))
+    return schemas.PostSearchPage(items=items, next_offset=next_offset)
 
 
 @router.get("/{post_id}", response_model=schemas.PostOut)
-def get_post(post_id: int, db: Session = Depends(get_db)):
+def get_post(post_id: int, request: Request, db: Session = Depends(get_db)):
     post = db.get(models.NeighborPost, post_id)
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
-    return _post_to_schema(post)
+    # row version is enough here: edits bump updated_at, claims change user_id
+    etag = conditional.row_etag("post", post.id, post.user_id, post.updated_at)
+    if conditional.etag_matches(request, etag):
+        return conditional.not_modified(etag, conditional.PUBLIC_REVALIDATE)
+    return conditional.conditional_json(request, _post_to_schema(post), etag=etag)
 
 
 @router.post("", response_model=schemas.PostOut)
 def create_post(
     payload: schemas.PostCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     post = models.NeighborPost(
         user_id=current_user.id,
@@ -154,10 +265,15 @@ def create_post(
         content_html=payload.content_html,
         images=json.dumps(payload.images) if payload.images else None,
         created_at=datetime.now(KST),   # 한국 시간으로 저장
+        **content.derive_post_fields(payload.content_html, payload.cover, payload.images),
     )
     db.add(post)
+    db.flush()
+    search.index_post(db, post)
+    counters.add(db, counters.NEIGHBOR_POSTS)
     db.commit()
     db.refresh(post)
+    _bump_feed_version()
     return _post_to_schema(post)
 
 
@@ -166,7 +282,7 @@ def update_post(
     post_id: int,
     payload: schemas.PostUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     post = db.get(models.NeighborPost, post_id)
     if not post:
@@ -182,9 +298,17 @@ def update_post(
         post.content_html = payload.content_html
     if payload.images is not None:
         post.images = json.dumps(payload.images)
+    if payload.cover is not None or payload.content_html is not None or payload.images is not None:
+        for field, value in content.derive_post_fields(
+            post.content_html, post.cover, _serialize_images(post.images)
+        ).items():
+            setattr(post, field, value)
+    if payload.title is not None or payload.content_html is not None:
+        search.index_post(db, post)
 
     db.commit()
     db.refresh(post)
+    _bump_feed_version()
     return _post_to_schema(post)
 
 
@@ -192,7 +316,7 @@ def update_post(
 def delete_post(
     post_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     post = db.get(models.NeighborPost, post_id)
     if not post:
@@ -200,15 +324,18 @@ def delete_post(
     if post.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
+    search.remove_post(db, post.id)
     db.delete(post)
+    counters.add(db, counters.NEIGHBOR_POSTS, -1)
     db.commit()
+    _bump_feed_version()
     return
 
 @router.post("/{post_id}/claim", status_code=status.HTTP_204_NO_CONTENT)
 def claim_post(
     post_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     """
     소유권 등록(Claim) 기능
@@ -228,6 +355,7 @@ def claim_post(
         post.user_id = current_user.id
         db.add(post)
         db.commit()
+        _bump_feed_version()
         return
 
     # 조건이 맞지 않으면 권한 거부
@@ -235,19 +363,45 @@ def claim_post(
 
 
 @router.get("/{post_id}/comments", response_model=List[schemas.CommentOut])
-def list_comments(post_id: int, db: Session = Depends(get_db)):
-    """특정 게시글의 댓글 목록 조회"""
-    post = db.get(models.NeighborPost, post_id)
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-
-    comments = (
+def list_comments(
+    post_id: int,
+    request: Request,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """특정 게시글의 댓글 목록 조회 (작성순, keyset 페이지네이션)
+    - 다음 페이지가 있으면 X-Next-Cursor 헤더로 cursor 값을 돌려준다.
+    """
+    safe_limit = max(1, min(limit, 200))
+    q = (
         db.query(models.NeighborComment)
+        .options(joinedload(models.NeighborComment.author).load_only(models.User.display_name))
         .filter(models.NeighborComment.post_id == post_id)
-        .order_by(models.NeighborComment.created_at.asc())
+    )
+    if cursor:
+        after_ts, after_id = _parse_comment_cursor(cursor)
+        q = q.filter(
+            or_(
+                models.NeighborComment.created_at > after_ts,
+                and_(
+                    models.NeighborComment.created_at == after_ts,
+                    models.NeighborComment.id > after_id,
+                ),
+            )
+        )
+    comments = (
+        q.order_by(models.NeighborComment.created_at.asc(), models.NeighborComment.id.asc())
+        .limit(safe_limit + 1)
         .all()
     )
-    return [
+    # only an empty first page needs the extra lookup to tell 404 from "no comments"
+    if not comments and not cursor and db.get(models.NeighborPost, post_id) is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    has_more = len(comments) > safe_limit
+    comments = comments[:safe_limit]
+    rows = [
         schemas.CommentOut(
             id=c.id,
             post_id=c.post_id,
@@ -257,13 +411,17 @@ def list_comments(post_id: int, db: Session = Depends(get_db)):
         )
         for c in comments
     ]
+    resp = conditional.conditional_json(request, rows)
+    if has_more:
+        resp.headers["X-Next-Cursor"] = _comment_cursor(comments[-1])
+    return resp
 
 @router.post("/{post_id}/comments", response_model=schemas.CommentOut)
 def create_comment(
     post_id: int,
     payload: dict = Body(...),
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     """댓글 작성"""
     post = db.get(models.NeighborPost, post_id)
@@ -274,15 +432,20 @@ def create_comment(
     if not content:
         raise HTTPException(status_code=400, detail="Content required")
 
+    now = datetime.now(KST)
     comment = models.NeighborComment(
         post_id=post_id,
         user_id=current_user.id,
         content=content,
-        created_at=datetime.now(KST),
+        created_at=now,
     )
     db.add(comment)
+    # same transaction as the insert; SQL-side increment is safe under concurrency
+    post.comment_count = models.NeighborPost.comment_count + 1
+    post.last_commented_at = now
     db.commit()
     db.refresh(comment)
+    _bump_feed_version()
 
     return schemas.CommentOut(
         id=comment.id,
@@ -298,7 +461,7 @@ def delete_comment(
     post_id: int,
     comment_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user_required),
+    current_user: Principal = Depends(get_principal_required),
 ):
     """댓글 삭제"""
     comment = db.get(models.NeighborComment, comment_id)
@@ -307,6 +470,24 @@ def delete_comment(
     if comment.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
+    owner_post_id = comment.post_id
     db.delete(comment)
+    db.flush()
+    last = db.execute(
+        select(func.max(models.NeighborComment.created_at))
+        .where(models.NeighborComment.post_id == owner_post_id)
+    ).scalar_one()
+    db.execute(
+        update(models.NeighborPost)
+        .where(models.NeighborPost.id == owner_post_id)
+        .values(
+            comment_count=case(
+                (models.NeighborPost.comment_count > 0, models.NeighborPost.comment_count - 1),
+                else_=0,
+            ),
+            last_commented_at=last,
+        )
+    )
     db.commit()
+    _bump_feed_version()
     return
@@ -1,39 +1,182 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import Optional
+import asyncio
 import os
 import httpx
 
+from .. import cache, conditional, geo
+
 router = APIRouter()
 
 BASE_URL = "https://apis.data.go.kr/B551011/KorService1/searchKeyword1"
 
+# 검색 결과는 자주 바뀌지 않음; TourAPI 장애 중에는 만료된 결과를 stale로 응답.
+# 값은 정규화된 결과({"items": [...], "totalCount": n})만 캐시.
+_cache = cache.namespace("tour_search", ttl=600.0, stale_ttl=86400.0)
+_upstream = cache.upstream("tour")
+RETRY_AFTER = 30  # seconds, for 503s while TourAPI is down and nothing is cached
+MAX_KEYWORDS = 10  # /search/batch
+_fetch_slots = asyncio.Semaphore(4)  # concurrent TourAPI calls per worker
+
+CACHE_CONTROL = "public, max-age=600"
+STALE_CACHE_CONTROL = "public, max-age=30"
+
+
+class TourAPIError(Exception):
+    """TourAPI answered, but not with results (e.g. a resultCode error as XML)."""
+
+
+def _text(value) -> Optional[str]:
+    text = str(value).strip() if value is not None else ""
+    return text or None
+
+
+def normalize_item(it: dict) -> dict:
+    """The fields the app uses, TourAPI names kept; mapx/mapy as floats."""
+    return {
+        "contentid": _text(it.get("contentid")),
+        "contenttypeid": _text(it.get("contenttypeid")),
+        "title": _text(it.get("title")),
+        "addr1": _text(it.get("addr1")),
+        "addr2": _text(it.get("addr2")),
+        "mapx": geo.to_float(it.get("mapx")),
+        "mapy": geo.to_float(it.get("mapy")),
+        "firstimage": _text(it.get("firstimage")),
+        "firstimage2": _text(it.get("firstimage2")),
+        "tel": _text(it.get("tel")),
+        "areacode": _text(it.get("areacode")),
+        "sigungucode": _text(it.get("sigungucode")),
+    }
+
+
+def _normalize(data) -> dict:
+    if not isinstance(data, dict):
+        raise TourAPIError("unexpected response")
+    resp = data.get("response") or {}
+    header = resp.get("header") or {}
+    if str(header.get("resultCode", "0000")) not in {"0000", "00"}:
+        raise TourAPIError(f"{header.get('resultCode')} {header.get('resultMsg')}")
+    body = resp.get("body") or {}
+    items = body.get("items") or {}
+    items = items.get("item") if isinstance(items, dict) else items
+    if isinstance(items, dict):
+        items = [items]
+    items = [normalize_item(it) for it in items or [] if isinstance(it, dict)]
+    try:
+        total = int(body.get("totalCount") or len(items))
+    except (TypeError, ValueError):
+        total = len(items)
+    return {"items": items, "totalCount": total}
+
+
+def _key(keyword: str, rows: int, page: int) -> str:
+    return f"{keyword}:{rows}:{page}"
+
+
+async def _search(service_key: str, keyword: str, rows: int, page: int) -> dict:
+    params = {
+        "serviceKey": service_key,
+        "MobileOS": "ETC",
+        "MobileApp": "readandlead",
+        "numOfRows": rows,
+        "pageNo": page,
+        "keyword": keyword,
+        "_type": "json",
+    }
+    async with _fetch_slots:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            r = await client.get(BASE_URL, params=params)
+    r.raise_for_status()
+    # 키 오류 등은 200 + XML로 옴
+    if "application/json" not in r.headers.get("content-type", ""):
+        raise TourAPIError(r.text[:200])
+    return _normalize(r.json())
+
+
+async def search(keyword: str, rows: int = 10, page: int = 1) -> Optional[cache.Fetched]:
+    """Normalized, cached TourAPI keyword search. None when no key is set, or
+    when TourAPI fails and nothing is cached."""
+    service_key = os.getenv("TOURAPI_KEY")
+    if not service_key:
+        return None
+    return await _cache.fetch(
+        _key(keyword, rows, page), lambda: _search(service_key, keyword, rows, page), _upstream
+    )
+
+
+def _unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="TourAPI unavailable",
+        headers={"Retry-After": str(RETRY_AFTER)},
+    )
+
 
 @router.get("/search")
 async def tour_search(
+    request: Request,
     keyword: str = Query(..., description="검색 키워드(도시명/장소 키워드)"),
     numOfRows: int = Query(10, ge=1, le=50),
     pageNo: int = Query(1, ge=1),
 ):
     """Proxy to TourAPI (KorService1 searchKeyword1) using env TOURAPI_KEY."""
-    service_key = os.getenv("TOURAPI_KEY")
-    if not service_key:
+    if not os.getenv("TOURAPI_KEY"):
         return {"error": "TOURAPI_KEY not set"}
+    keyword = keyword.strip()
+    if not keyword:
+        raise HTTPException(status_code=400, detail="keyword is required")
 
-    params = {
-        "serviceKey": service_key,
-        "MobileOS": "ETC",
-        "MobileApp": "readandlead",
-        "numOfRows": numOfRows,
-        "pageNo": pageNo,
-        "keyword": keyword,
-        "_type": "json",
+    found = await search(keyword, numOfRows, pageNo)
+    if found is None:
+        raise _unavailable()
+    # 프론트 파서가 기대하는 구조(response.body.items.item)
+    data = {
+        "response": {
+            "body": {
+                "items": {"item": found.value["items"]},
+                "totalCount": found.value["totalCount"],
+                "numOfRows": numOfRows,
+                "pageNo": pageNo,
+            }
+        }
     }
+    if found.stale:
+        data["stale"] = True
+    return conditional.conditional_json(
+        request, data, cache_control=STALE_CACHE_CONTROL if found.stale else CACHE_CONTROL
+    )
+
 
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        r = await client.get(BASE_URL, params=params)
-        r.raise_for_status()
-        ct = r.headers.get("content-type", "")
-        if "application/json" in ct:
-            return r.json()
-        return r.text
+@router.get("/search/batch")
+async def tour_search_batch(
+    request: Request,
+    keywords: str = Query(..., description="콤마 구분 키워드, 최대 10개 (예: 전주,제주)"),
+    numOfRows: int = Query(5, ge=1, le=50),
+):
+    """Several keyword searches (first page each) in one call, for the
+    book → location flow. Keywords that fail are listed in ``failed``."""
+    if not os.getenv("TOURAPI_KEY"):
+        return {"error": "TOURAPI_KEY not set"}
+    wanted = list(dict.fromkeys(k.strip() for k in keywords.split(",") if k.strip()))
+    if not wanted:
+        raise HTTPException(status_code=400, detail="keywords is required")
+    if len(wanted) > MAX_KEYWORDS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_KEYWORDS} keywords")
 
+    found = await asyncio.gather(*(search(k, numOfRows, 1) for k in wanted))
+    results = {}
+    failed = []
+    stale = False
+    for keyword, hit in zip(wanted, found):
+        if hit is None:
+            failed.append(keyword)
+            continue
+        results[keyword] = hit.value
+        stale = stale or hit.stale
+    if not results:
+        raise _unavailable()
+    data = {"results": results, "failed": failed}
+    if stale:
+        data["stale"] = True
+    cache_control = STALE_CACHE_CONTROL if stale or failed else CACHE_CONTROL
+    return conditional.conditional_json(request, data, cache_control=cache_control)
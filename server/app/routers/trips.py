@@ -1,10 +1,14 @@
 # server/app/routers/trips.py
 from openai import OpenAI
 import os, re, json, math, requests, sqlite3, datetime
-from fastapi import APIRouter, Body, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, Body, UploadFile, File, Form, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional
 
+from .. import cache, conditional, counters, images, warmup
+from ..database import SessionLocal
+from ..responses import FastJSONResponse
+
 # ============== OpenAI / Kakao Config ==============
 def _get_openai_client():
     """지연 초기화: 환경변수 없을 때는 None 반환(서버 기동 실패 방지)."""
@@ -24,6 +28,10 @@ print("DEBUG Init (keys exist):", bool(os.getenv("OPENAI_API_KEY")), bool(KAKAO_
 
 router = APIRouter()
 
+# 외부 조회 캐시: 책 컨텍스트(위키/구글북스)와 Kakao 장소 검색은 자주 바뀌지 않음
+_book_context_cache = cache.namespace("book_context", ttl=86400.0)
+_kakao_cache = cache.namespace("kakao_places", ttl=86400.0)
+
 # ========================== 데이터 모델 ==========================
 class StopItem(BaseModel):
     time: Optional[str] = None
@@ -65,6 +73,7 @@ class PlanInput(BaseModel):
 
 # ========================== 간단 영속 저장소(sqlite) ==========================
 DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "db.sqlite3"))
+_counters_seeded = False
 
 def _conn():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -115,6 +124,11 @@ def _conn():
         )
         """
     )
+    global _counters_seeded
+    if not _counters_seeded:
+        # trips/rewards 합계(counters 테이블)는 프로세스당 한 번만 채움
+        counters.seed_raw(conn)
+        _counters_seeded = True
     return conn
 
 def _utcnow():
@@ -335,6 +349,9 @@ def search_place_kakao(query: str, city: Optional[str] = None):
         return []
     headers = {"Authorization": f"KakaoAK {KAKAO_KEY}"}
     q = query if not city else f"{city} {query}"
+    hit = _kakao_cache.get(q)
+    if hit:
+        return hit.value
     try:
         r = requests.get(
             KAKAO_URL,
@@ -357,6 +374,7 @@ def search_place_kakao(query: str, city: Optional[str] = None):
                 "source": "kakao_places",
                 "place_id": d.get("id"),
             })
+        _kakao_cache.set(q, res)
         return res
     except Exception as e:
         print("WARN Kakao search error:", e)
@@ -718,6 +736,11 @@ def persist_trip(trip_id: str, payload: PersistInput):
     now = _utcnow()
     # 동일 trip_id의 이전 스톱 제거(요청: 새 계획으로 덮어쓰기)
     conn.execute("DELETE FROM trip_stops WHERE user_id=? AND trip_id=?", (user_id, trip_id))
+    exists = conn.execute(
+        "SELECT 1 FROM trips WHERE user_id=? AND trip_id=?", (user_id, trip_id)
+    ).fetchone()
+    if not exists:
+        counters.add_raw(conn, counters.TRIPS)
     conn.execute(
         "INSERT OR REPLACE INTO trips(user_id, trip_id, book_title, theme, days, created_at) VALUES(?,?,?,?,?,?)",
         (user_id, trip_id, payload.bookTitle, payload.theme or "", int(payload.days), now),
@@ -755,7 +778,7 @@ def persist_trip(trip_id: str, payload: PersistInput):
     return {"trip_id": trip_id, "stop_ids": inserted}
 
 @router.get("/{trip_id}/mine")
-def get_my_trip(trip_id: str):
+def get_my_trip(trip_id: str, request: Request):
     user_id = _get_user_id_from_header()
     conn = _conn()
     trip = conn.execute(
@@ -769,13 +792,13 @@ def get_my_trip(trip_id: str):
     conn.close()
     if not trip:
         raise HTTPException(status_code=404, detail="trip not found")
-    return {
+    return conditional.conditional_json(request, {
         "trip_id": trip_id,
         "book_title": trip["book_title"],
         "theme": trip["theme"],
         "days": trip["days"],
         "stops": [dict(r) for r in stops],
-    }
+    }, cache_control=conditional.PRIVATE_REVALIDATE)
 
 class ProofIn(BaseModel):
     proof_url: str
@@ -844,6 +867,7 @@ def claim_reward(trip_id: str):
         "INSERT INTO rewards(user_id, trip_id, book_title, claimed_at) VALUES(?,?,?,?)",
         (user_id, trip_id, (book["book_title"] if book else ""), _utcnow()),
     )
+    counters.add_raw(conn, counters.REWARDS_CLAIMED)
     conn.commit()
     conn.close()
     return {"ok": True, "message": f"'{(book['book_title'] if book else '')}' 미션 클리어! 리워드가 발급되었습니다."}
@@ -868,8 +892,10 @@ def list_rewards():
     return out
 
 # -------------------- Book context (for nice popup) --------------------
-@router.get("/book-context")
-def get_book_context(title: str):
+def build_book_context(title: str) -> dict:
+    hit = _book_context_cache.get(title)
+    if hit:
+        return hit.value
     # 원문 컨텍스트(위키/북스 요약 병합)
     ctx = fetch_book_context(title) or ""
     # 배경 키워드(도시/행정구)
@@ -887,41 +913,96 @@ def get_book_context(title: str):
         content = content.strip()
     else:
         content = "관련 요약 정보를 찾지 못했습니다."
-    return {"title": title, "author": author or "알 수 없음", "background": hints or "—", "content": content, "cover_url": cover_url}
+    out = {"title": title, "author": author or "알 수 없음", "background": hints or "—", "content": content, "cover_url": cover_url}
+    if ctx or meta:
+        # 조회가 전부 실패한 결과는 캐시하지 않음(다음 요청에서 재시도)
+        _book_context_cache.set(title, out)
+    return out
+
+@router.get("/book-context")
+def get_book_context(title: str):
+    return build_book_context(title)
+
+@warmup.register("book_context", priority=80, budget=20.0)
+def _warm_book_context():
+    """최근 여행에 쓰인 책 제목 상위 N개(WARMUP_BOOK_TITLES, 기본 10)."""
+    limit = int(os.getenv("WARMUP_BOOK_TITLES", "10") or 0)
+    if limit <= 0:
+        return
+    conn = _conn()
+    try:
+        rows = conn.execute(
+            "SELECT book_title FROM trips WHERE book_title IS NOT NULL AND book_title<>'' "
+            "GROUP BY book_title ORDER BY MAX(created_at) DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    finally:
+        conn.close()
+    for r in rows:
+        build_book_context(r["book_title"])
+
+def headline_counts() -> dict:
+    """trips / rewards_claimed 합계 (counters 테이블, O(1))."""
+    conn = _conn()
+    try:
+        return counters.get_raw(conn, (counters.TRIPS, counters.REWARDS_CLAIMED))
+    finally:
+        conn.close()
 
 # -------------------- Summary (my page) --------------------
 @router.get("/summary")
 def my_trips_summary():
     user_id = _get_user_id_from_header()
     conn = _conn()
+    # one aggregate + one windowed query instead of two queries per trip
     trips = conn.execute(
-        "SELECT trip_id, book_title FROM trips WHERE user_id=? ORDER BY created_at DESC",
+        """
+        SELECT t.trip_id, t.book_title, COUNT(s.id) AS total,
+               SUM(CASE WHEN s.status='success' THEN 1 ELSE 0 END) AS succ
+        FROM trips t
+        LEFT JOIN trip_stops s ON s.user_id=t.user_id AND s.trip_id=t.trip_id
+        WHERE t.user_id=?
+        GROUP BY t.trip_id, t.book_title, t.created_at
+        ORDER BY t.created_at DESC
+        """,
         (user_id,)
     ).fetchall()
+    proofs: dict = {}
+    for trip_id, proof_url in conn.execute(
+        """
+        SELECT trip_id, proof_url FROM (
+            SELECT trip_id, proof_url,
+                   ROW_NUMBER() OVER (PARTITION BY trip_id ORDER BY id DESC) AS rn
+            FROM trip_stops WHERE user_id=? AND proof_url IS NOT NULL
+        ) WHERE rn <= 3 ORDER BY trip_id, rn
+        """,
+        (user_id,)
+    ):
+        if proof_url:
+            proofs.setdefault(trip_id, []).append(proof_url)
+    conn.close()
+    # 요약 카드는 작은 썸네일만 표시: 변형 이미지가 있으면 thumb으로 교체
+    if proofs:
+        db = SessionLocal()
+        try:
+            thumbs = images.thumbs(db, (u for urls in proofs.values() for u in urls))
+        finally:
+            db.close()
+        proofs = {tid: [thumbs.get(u, u) for u in urls] for tid, urls in proofs.items()}
     out = []
-    for t in trips:
-        trip_id = t["trip_id"]
-        rows = conn.execute(
-            "SELECT COUNT(*) as total, SUM(CASE WHEN status='success' THEN 1 ELSE 0 END) as succ FROM trip_stops WHERE user_id=? AND trip_id=?",
-            (user_id, trip_id),
-        ).fetchone()
-        proofs = conn.execute(
-            "SELECT proof_url FROM trip_stops WHERE user_id=? AND trip_id=? AND proof_url IS NOT NULL ORDER BY id DESC LIMIT 3",
-            (user_id, trip_id),
-        ).fetchall()
-        total = int(rows["total"] or 0)
-        succ = int(rows["succ"] or 0)
+    for trip_id, book_title, total, succ in trips:
+        total = int(total or 0)
+        succ = int(succ or 0)
         percent = int(round((succ/total)*100)) if total else 0
         out.append({
             "trip_id": trip_id,
-            "book_title": t["book_title"],
+            "book_title": book_title,
             "total": total,
             "succeeded": succ,
             "percent": percent,
-            "proofs": [r["proof_url"] for r in proofs if r["proof_url"]],
+            "proofs": proofs.get(trip_id, []),
         })
-    conn.close()
-    return out
+    return FastJSONResponse(out)
 
 # 삭제: trip과 관련 데이터 일괄 제거
 @router.delete("/{trip_id}")
@@ -930,15 +1011,31 @@ def delete_trip(trip_id: str):
     conn = _conn()
     conn.execute("DELETE FROM diary WHERE user_id=? AND trip_id=?", (user_id, trip_id))
     conn.execute("DELETE FROM trip_stops WHERE user_id=? AND trip_id=?", (user_id, trip_id))
-    conn.execute("DELETE FROM rewards WHERE user_id=? AND trip_id=?", (user_id, trip_id))
-    conn.execute("DELETE FROM trips WHERE user_id=? AND trip_id=?", (user_id, trip_id))
+    rewards = conn.execute("DELETE FROM rewards WHERE user_id=? AND trip_id=?", (user_id, trip_id)).rowcount
+    trips = conn.execute("DELETE FROM trips WHERE user_id=? AND trip_id=?", (user_id, trip_id)).rowcount
+    counters.add_raw(conn, counters.REWARDS_CLAIMED, -rewards)
+    counters.add_raw(conn, counters.TRIPS, -trips)
     conn.commit(); conn.close()
     return {"ok": True}
 
 
 # ========================== Stops (for Itinerary panel) ==========================
+def stops_in_bbox(west: float, south: float, east: float, north: float) -> list[dict]:
+    """지도 클러스터용: bbox 안의 좌표가 있는 스톱 (routers/map.py)."""
+    user_id = _get_user_id_from_header()
+    conn = _conn()
+    try:
+        rows = conn.execute(
+            "SELECT id, trip_id, title, place, status, lat, lng FROM trip_stops "
+            "WHERE user_id=? AND lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?",
+            (user_id, south, north, west, east),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
 @router.get("/{trip_id}/stops")
-def list_stops(trip_id: str):
+def list_stops(trip_id: str, request: Request):
     user_id = _get_user_id_from_header()
     conn = _conn()
     rows = conn.execute(
@@ -960,7 +1057,7 @@ def list_stops(trip_id: str):
             "startTime": None,
             "notes": r["mission"],
         })
-    return out
+    return conditional.conditional_json(request, out, cache_control=conditional.PRIVATE_REVALIDATE)
 
 
 # ========================== Add single stop (manual/AI pick) ==========================
@@ -1038,7 +1135,7 @@ def _ensure_diary(conn: sqlite3.Connection):
     )
 
 @router.get("/{trip_id}/diary")
-def list_diary(trip_id: str):
+def list_diary(trip_id: str, request: Request):
     user_id = _get_user_id_from_header()
     conn = _conn(); _ensure_diary(conn)
     rows = conn.execute(
@@ -1059,7 +1156,7 @@ def list_diary(trip_id: str):
             "created_at": r["created_at"],
             "author_id": str(user_id),
         })
-    return out
+    return conditional.conditional_json(request, out, cache_control=conditional.PRIVATE_REVALIDATE)
 
 class DiaryIn(BaseModel):
     entry_type: Optional[str] = "note"
@@ -1,11 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import os
+import random
+import tempfile
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Final
-
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from typing import AsyncIterator, Final, Optional
+
+import httpx
+from fastapi import APIRouter, HTTPException, Request
+from jose import JWTError, jwt
+from pydantic import BaseModel, Field
+
+from .. import images, security
+from . import posts
+from ..upload_stream import (
+    EXTENSIONS,
+    MAX_BYTES,
+    SNIFF_BYTES,
+    BadForm,
+    ImageUpload,
+    NotAnImage,
+    UploadTooLarge,
+    read_image,
+    sniff_image,
+)
 
 router = APIRouter()
 
@@ -13,6 +37,25 @@ ALLOWED_EXTENSIONS: Final[set[str]] = {".jpg", ".jpeg", ".png", ".gif", ".webp",
 
 STORAGE_MODE = (os.getenv("UPLOADS_STORAGE", "local") or "local").strip().lower()
 
+# presigned direct uploads (s3/supabase): the client sends the bytes to storage
+# itself and confirms with the slot token within this many seconds
+PRESIGN_TTL = int(os.getenv("UPLOADS_PRESIGN_TTL", "600"))
+CONFIRM_GRACE = 3600  # on top of PRESIGN_TTL, for uploads still running at expiry
+PENDING_PREFIX = os.getenv("UPLOADS_PENDING_PREFIX", "pending/").lstrip("/")
+# unconfirmed direct uploads are deleted this often (0: never, e.g. when a
+# bucket lifecycle rule on PENDING_PREFIX does it)
+PENDING_SWEEP_EVERY = float(os.getenv("UPLOADS_PENDING_SWEEP_EVERY", "3600"))
+
+# blocking storage calls (file writes, boto3) run here, off the event loop
+_io_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPLOADS_IO_WORKERS", "4")), thread_name_prefix="uploads-io"
+)
+
+
+async def _run_io(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_pool, lambda: fn(*args, **kwargs))
+
 
 def _normalize_extension(filename: str | None) -> str:
     _, ext = os.path.splitext(filename or "upload")
@@ -24,9 +67,40 @@ def _assert_valid_extension(ext: str) -> None:
         raise HTTPException(status_code=400, detail="Only image files are allowed")
 
 
-if STORAGE_MODE == "supabase":
-    import requests
+@contextlib.asynccontextmanager
+async def _temp_path(suffix: str) -> AsyncIterator[Path]:
+    fd, name = tempfile.mkstemp(prefix="upload-", suffix=suffix)
+    os.close(fd)
+    path = Path(name)
+    try:
+        yield path
+    finally:
+        await _run_io(path.unlink, missing_ok=True)
+
+
+# Each storage mode below defines:
+#   _public_url(filename) -> URL the stored file is served from
+#   _store(upload, filename) -> URL, streaming the upload
+#   _put(filename, data, content_type) -> URL, for small generated files
+#   _source(filename) -> async context manager giving a local path to read it
+# and, where direct uploads are possible (DIRECT_UPLOADS), for objects under
+# the private PENDING_PREFIX until confirmed:
+#   _presign(filename, content_type, size) -> how the client uploads (method/url/fields/headers)
+#   _stat(filename, pending) -> (size, content type, first bytes), None if there is no such object
+#   _publish(filename, content_type) -> copy pending to the public key, drop the pending one
+#   _discard(filename) -> drop the pending object
+#   _pending_before(cutoff) -> filenames of pending objects older than ``cutoff``
+
+
+def _object_size(content_range: Optional[str], content_length: Optional[str]) -> Optional[int]:
+    """Total size from a ranged response (``bytes 0-15/12345``), else its length."""
+    total = (content_range or "").rpartition("/")[2]
+    if total.isdigit():
+        return int(total)
+    return int(content_length) if content_length and content_length.isdigit() else None
+
 
+if STORAGE_MODE == "supabase":
     SUPABASE_URL = os.getenv("SUPABASE_URL")
     SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY") or os.getenv("SUPABASE_SERVICE_ROLE")
     SUPABASE_BUCKET = os.getenv("SUPABASE_BUCKET")
@@ -44,37 +118,139 @@ if STORAGE_MODE == "supabase":
     def _supabase_upload_path(filename: str) -> str:
         return f"{SUPABASE_PATH_PREFIX}{filename}" if SUPABASE_PATH_PREFIX else filename
 
-    @router.post("/uploads")
-    async def upload_file(file: UploadFile = File(...)):
-        ext = _normalize_extension(file.filename)
-        _assert_valid_extension(ext)
-
-        filename = f"{uuid.uuid4().hex}{ext}"
-        dest_path = _supabase_upload_path(filename)
-        contents = await file.read()
-        content_type = file.content_type
-        await file.close()
-
+    def _supabase_object_url(filename: str) -> str:
         # Supabase REST storage API requires the bucket name in the path
-        url = f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{SUPABASE_BUCKET}/{dest_path}"
-        headers = {
-            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-            "apikey": SUPABASE_SERVICE_KEY,
+        return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{SUPABASE_BUCKET}/{_supabase_upload_path(filename)}"
+
+    def _supabase_headers(**extra: str) -> dict[str, str]:
+        return {"Authorization": f"Bearer {SUPABASE_SERVICE_KEY}", "apikey": SUPABASE_SERVICE_KEY, **extra}
+
+    def _public_url(filename: str) -> str:
+        return f"{SUPABASE_PUBLIC_BASE.rstrip('/')}/{_supabase_upload_path(filename)}"
+
+    async def _post_object(filename: str, content, content_type: str) -> str:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
+            res = await client.post(
+                _supabase_object_url(filename),
+                headers=_supabase_headers(**{"Content-Type": content_type}),
+                params={"upsert": "true"},
+                content=content,
+            )
+        if not res.is_success:
+            raise HTTPException(status_code=500, detail=f"Upload failed: {res.text}")
+        return _public_url(filename)
+
+    async def _store(upload: ImageUpload, filename: str) -> str:
+        # body streamed (chunked) as it is read from the client
+        return await _post_object(filename, upload.chunks(), upload.content_type)
+
+    async def _put(filename: str, data: bytes, content_type: str) -> str:
+        return await _post_object(filename, data, content_type)
+
+    @contextlib.asynccontextmanager
+    async def _source(filename: str) -> AsyncIterator[Path]:
+        async with _temp_path(Path(filename).suffix) as path:
+            async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
+                async with client.stream("GET", _supabase_object_url(filename), headers=_supabase_headers()) as res:
+                    res.raise_for_status()
+                    out = await _run_io(path.open, "wb")
+                    try:
+                        async for chunk in res.aiter_bytes():
+                            await _run_io(out.write, chunk)
+                    finally:
+                        await _run_io(out.close)
+            yield path
+
+    # direct uploads go to a private bucket and are copied into the public one
+    # on confirm; without SUPABASE_PENDING_BUCKET direct uploads are off
+    SUPABASE_PENDING_BUCKET = os.getenv("SUPABASE_PENDING_BUCKET")
+    DIRECT_UPLOADS = bool(SUPABASE_PENDING_BUCKET)
+
+    def _pending_url(filename: str) -> str:
+        return f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/{SUPABASE_PENDING_BUCKET}/{PENDING_PREFIX}{filename}"
+
+    async def _presign(filename: str, content_type: str, size: int) -> dict:
+        # signed upload URLs pin neither size nor type (only the pending
+        # bucket's limits do); both are checked on confirm
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            res = await client.post(
+                f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/upload/sign/"
+                f"{SUPABASE_PENDING_BUCKET}/{PENDING_PREFIX}{filename}",
+                headers=_supabase_headers(),
+                json={},
+            )
+        if not res.is_success:
+            raise HTTPException(status_code=500, detail=f"Presign failed: {res.text}")
+        signed = res.json()["url"]  # /object/upload/sign/<bucket>/<path>?token=...
+        return {
+            "method": "PUT",
+            "url": f"{SUPABASE_URL.rstrip('/')}/storage/v1{signed}",
+            "headers": {"Content-Type": content_type},
         }
-        if content_type:
-            headers["Content-Type"] = content_type
 
-        res = requests.post(url, headers=headers, params={"upsert": "true"}, data=contents)
-        if not res.ok:
-            detail = res.text
-            raise HTTPException(status_code=500, detail=f"Upload failed: {detail}")
-
-        public_url = f"{SUPABASE_PUBLIC_BASE.rstrip('/')}/{dest_path}"
-        return {"url": public_url}
+    async def _stat(filename: str, pending: bool) -> Optional[tuple[int, str, bytes]]:
+        url = _pending_url(filename) if pending else _supabase_object_url(filename)
+        headers = _supabase_headers(Range=f"bytes=0-{SNIFF_BYTES - 1}")
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            async with client.stream("GET", url, headers=headers) as res:
+                if 400 <= res.status_code < 500:
+                    return None
+                res.raise_for_status()
+                head = b""
+                async for chunk in res.aiter_bytes():
+                    head += chunk
+                    if len(head) >= SNIFF_BYTES:
+                        break
+        size = _object_size(res.headers.get("content-range"), res.headers.get("content-length"))
+        size = size if size is not None else len(head)
+        return size, res.headers.get("content-type", ""), head[:SNIFF_BYTES]
+
+    async def _publish(filename: str, content_type: str) -> None:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)) as client:
+            res = await client.post(
+                f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/copy",
+                headers=_supabase_headers(),
+                json={
+                    "bucketId": SUPABASE_PENDING_BUCKET,
+                    "sourceKey": f"{PENDING_PREFIX}{filename}",
+                    "destinationBucket": SUPABASE_BUCKET,
+                    "destinationKey": _supabase_upload_path(filename),
+                },
+            )
+        if not res.is_success:
+            raise HTTPException(status_code=500, detail=f"Upload failed: {res.text}")
+        await _discard(filename)
+
+    async def _discard(filename: str) -> None:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            await client.delete(_pending_url(filename), headers=_supabase_headers())
+
+    async def _pending_before(cutoff: float) -> list[str]:
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            res = await client.post(
+                f"{SUPABASE_URL.rstrip('/')}/storage/v1/object/list/{SUPABASE_PENDING_BUCKET}",
+                headers=_supabase_headers(),
+                json={
+                    "prefix": PENDING_PREFIX.rstrip("/"),
+                    "limit": 1000,
+                    "offset": 0,
+                    "sortBy": {"column": "created_at", "order": "asc"},
+                },
+            )
+        res.raise_for_status()
+        stale = []
+        for item in res.json():
+            created = item.get("created_at")
+            if not created or not item.get("name"):
+                continue
+            if datetime.fromisoformat(created.replace("Z", "+00:00")).timestamp() < cutoff:
+                stale.append(item["name"])
+        return stale
 
 elif STORAGE_MODE == "s3":
     try:
         import boto3
+        from botocore.config import Config
         from botocore.exceptions import BotoCoreError, ClientError
     except Exception as exc:  # pragma: no cover - import guard
         raise RuntimeError("boto3 is required for S3 uploads; add it to requirements.txt") from exc
@@ -88,6 +264,11 @@ elif STORAGE_MODE == "s3":
     S3_REGION = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
     S3_ACL = os.getenv("UPLOADS_S3_ACL", "public-read")
     S3_ENDPOINT = os.getenv("UPLOADS_S3_ENDPOINT") or os.getenv("AWS_S3_ENDPOINT")
+    # "path" for S3-compatible stand-ins (MinIO etc.) without per-bucket hostnames
+    S3_ADDRESSING_STYLE = os.getenv("UPLOADS_S3_ADDRESSING_STYLE")
+    DIRECT_UPLOADS = True
+    # multipart above one part; S3 parts must be at least 5 MiB (except the last)
+    S3_PART_SIZE = max(int(os.getenv("UPLOADS_S3_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
 
     if not S3_PUBLIC_BASE:
         if S3_REGION:
@@ -98,27 +279,131 @@ elif STORAGE_MODE == "s3":
     client_kwargs = {"region_name": S3_REGION}
     if S3_ENDPOINT:
         client_kwargs["endpoint_url"] = S3_ENDPOINT
+    if S3_ADDRESSING_STYLE:
+        client_kwargs["config"] = Config(s3={"addressing_style": S3_ADDRESSING_STYLE})
     s3_client = boto3.client("s3", **client_kwargs)
 
-    @router.post("/uploads")
-    async def upload_file(file: UploadFile = File(...)):
-        ext = _normalize_extension(file.filename)
-        _assert_valid_extension(ext)
+    def _public_url(filename: str) -> str:
+        return f"{S3_PUBLIC_BASE.rstrip('/')}/{S3_KEY_PREFIX}{filename}"
+
+    async def _store(upload: ImageUpload, filename: str) -> str:
+        key = f"{S3_KEY_PREFIX}{filename}"
+        extra_args = {"ACL": S3_ACL, "ContentType": upload.content_type}
+        # at most one part is buffered; smaller files go up in a single put
+        buffer = bytearray()
+        upload_id = None
+        parts: list[dict] = []
 
-        key = f"{S3_KEY_PREFIX}{uuid.uuid4().hex}{ext}"
-        contents = await file.read()
+        async def put_part(body: bytes) -> None:
+            part = await _run_io(
+                s3_client.upload_part, Bucket=S3_BUCKET, Key=key, UploadId=upload_id,
+                PartNumber=len(parts) + 1, Body=body,
+            )
+            parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+
+        try:
+            async for chunk in upload.chunks():
+                buffer += chunk
+                while len(buffer) >= S3_PART_SIZE:
+                    if upload_id is None:
+                        created = await _run_io(s3_client.create_multipart_upload, Bucket=S3_BUCKET, Key=key, **extra_args)
+                        upload_id = created["UploadId"]
+                    await put_part(bytes(buffer[:S3_PART_SIZE]))
+                    del buffer[:S3_PART_SIZE]
+
+            if upload_id is None:
+                await _run_io(s3_client.put_object, Bucket=S3_BUCKET, Key=key, Body=bytes(buffer), **extra_args)
+            else:
+                if buffer:
+                    await put_part(bytes(buffer))
+                await _run_io(
+                    s3_client.complete_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        except BaseException as exc:
+            if upload_id is not None:
+                try:
+                    await _run_io(s3_client.abort_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id)
+                except (BotoCoreError, ClientError):
+                    pass
+            if isinstance(exc, (BotoCoreError, ClientError)):
+                raise HTTPException(status_code=500, detail="Upload failed") from exc
+            raise
+
+        return _public_url(filename)
+
+    async def _put(filename: str, data: bytes, content_type: str) -> str:
         try:
-            extra_args = {"ACL": S3_ACL}
-            if file.content_type:
-                extra_args["ContentType"] = file.content_type
-            s3_client.put_object(Bucket=S3_BUCKET, Key=key, Body=contents, **extra_args)
+            await _run_io(
+                s3_client.put_object, Bucket=S3_BUCKET, Key=f"{S3_KEY_PREFIX}{filename}", Body=data,
+                ACL=S3_ACL, ContentType=content_type,
+            )
         except (BotoCoreError, ClientError) as exc:
             raise HTTPException(status_code=500, detail="Upload failed") from exc
-        finally:
-            await file.close()
+        return _public_url(filename)
+
+    @contextlib.asynccontextmanager
+    async def _source(filename: str) -> AsyncIterator[Path]:
+        async with _temp_path(Path(filename).suffix) as path:
+            await _run_io(s3_client.download_file, S3_BUCKET, f"{S3_KEY_PREFIX}{filename}", str(path))
+            yield path
+
+    async def _presign(filename: str, content_type: str, size: int) -> dict:
+        # browser-style POST policy to the private pending key (no ACL): S3
+        # itself rejects another size or type
+        post = await _run_io(
+            s3_client.generate_presigned_post, S3_BUCKET, f"{PENDING_PREFIX}{filename}",
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", size, size]],
+            ExpiresIn=PRESIGN_TTL,
+        )
+        return {"method": "POST", "url": post["url"], "fields": post["fields"]}
 
-        url = f"{S3_PUBLIC_BASE.rstrip('/')}/{key}"
-        return {"url": url}
+    async def _stat(filename: str, pending: bool) -> Optional[tuple[int, str, bytes]]:
+        key = f"{PENDING_PREFIX}{filename}" if pending else f"{S3_KEY_PREFIX}{filename}"
+        try:
+            obj = await _run_io(
+                s3_client.get_object, Bucket=S3_BUCKET, Key=key, Range=f"bytes=0-{SNIFF_BYTES - 1}"
+            )
+            head = await _run_io(obj["Body"].read)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in {"NoSuchKey", "404", "NotFound"}:
+                return None
+            raise HTTPException(status_code=500, detail="Upload check failed") from exc
+        except BotoCoreError as exc:
+            raise HTTPException(status_code=500, detail="Upload check failed") from exc
+        size = _object_size(obj.get("ContentRange"), str(obj.get("ContentLength", "")))
+        size = size if size is not None else len(head)
+        return size, obj.get("ContentType") or "", head
+
+    async def _publish(filename: str, content_type: str) -> None:
+        try:
+            await _run_io(
+                s3_client.copy_object, Bucket=S3_BUCKET, Key=f"{S3_KEY_PREFIX}{filename}",
+                CopySource={"Bucket": S3_BUCKET, "Key": f"{PENDING_PREFIX}{filename}"},
+                ACL=S3_ACL, ContentType=content_type, MetadataDirective="REPLACE",
+            )
+        except (BotoCoreError, ClientError) as exc:
+            raise HTTPException(status_code=500, detail="Upload failed") from exc
+        await _discard(filename)
+
+    async def _discard(filename: str) -> None:
+        try:
+            await _run_io(s3_client.delete_object, Bucket=S3_BUCKET, Key=f"{PENDING_PREFIX}{filename}")
+        except (BotoCoreError, ClientError):
+            pass
+
+    def _list_pending(cutoff: float) -> list[str]:
+        stale = []
+        pages = s3_client.get_paginator("list_objects_v2").paginate(Bucket=S3_BUCKET, Prefix=PENDING_PREFIX)
+        for page in pages:
+            for obj in page.get("Contents", []):
+                if obj["LastModified"].timestamp() < cutoff:
+                    stale.append(obj["Key"][len(PENDING_PREFIX):])
+        return stale
+
+    async def _pending_before(cutoff: float) -> list[str]:
+        return await _run_io(_list_pending, cutoff)
 
 else:  # default to local storage
     BASE_DIR = os.getenv("UPLOADS_DIR")
@@ -130,22 +415,234 @@ else:  # default to local storage
 
     PUBLIC_PREFIX = os.getenv("UPLOADS_PUBLIC_PATH", "/static/uploads")
 
-    @router.post("/uploads")
-    async def upload_file(file: UploadFile = File(...)):
-        ext = _normalize_extension(file.filename)
-        _assert_valid_extension(ext)
+    def _public_url(filename: str) -> str:
+        return f"{PUBLIC_PREFIX.rstrip('/')}/{filename}"
 
-        filename = f"{uuid.uuid4().hex}{ext}"
+    async def _store(upload: ImageUpload, filename: str) -> str:
         dest = BASE_PATH / filename
+        # written under a temp name, so a failed upload never shows up
+        partial = BASE_PATH / f".{filename}.part"
+        out = await _run_io(partial.open, "wb")
         try:
-            with dest.open("wb") as out:
-                while True:
-                    chunk = await file.read(1024 * 1024)
-                    if not chunk:
-                        break
-                    out.write(chunk)
-        finally:
-            await file.close()
+            async for chunk in upload.chunks():
+                await _run_io(out.write, chunk)
+            await _run_io(out.close)
+            await _run_io(partial.replace, dest)
+        except BaseException:
+            await _run_io(out.close)
+            await _run_io(partial.unlink, missing_ok=True)
+            raise
+
+        return _public_url(filename)
+
+    def _write_file(filename: str, data: bytes) -> None:
+        partial = BASE_PATH / f".{filename}.part"
+        partial.write_bytes(data)
+        partial.replace(BASE_PATH / filename)
+
+    async def _put(filename: str, data: bytes, content_type: str) -> str:
+        await _run_io(_write_file, filename, data)
+        return _public_url(filename)
+
+    @contextlib.asynccontextmanager
+    async def _source(filename: str) -> AsyncIterator[Path]:
+        yield BASE_PATH / filename
+
+    DIRECT_UPLOADS = False
+
+
+_PUBLIC_ROOT = _public_url("")
+
+
+def filename_for(url: Optional[str]) -> Optional[str]:
+    """Stored filename behind one of our upload URLs; None for anything else
+    (external links, the variants themselves)."""
+    if not url or not url.startswith(_PUBLIC_ROOT):
+        return None
+    name = url[len(_PUBLIC_ROOT):]
+    if not name or "/" in name or images.is_variant(name):
+        return None
+    return name
+
+
+def variant_urls(filename: str) -> dict[str, str]:
+    return {variant: _public_url(images.variant_name(filename, variant)) for variant in images.SIZES}
+
+
+async def make_variants(filename: str) -> dict[str, str]:
+    """Render, store and record the WebP variants of a stored upload."""
+    async with _source(filename) as path:
+        rendered = await images.render_async(str(path))
+    urls = {}
+    for variant, data in rendered.items():
+        urls[variant] = await _put(images.variant_name(filename, variant), data, "image/webp")
+    await _run_io(images.record, _public_url(filename), urls)
+    # feed summaries bake in cover_thumb: a new feed version (and ETag) picks it up
+    await _run_io(posts._bump_feed_version)
+    return urls
+
+
+_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+def _uploaded(filename: str, url: str) -> dict:
+    """Upload response: the file's URL and, once rendering is queued, where its
+    variants will appear. Those are pending: they 404 until rendered and stay
+    missing if rendering fails; feeds only list a thumb (``cover_thumb``) once
+    it exists."""
+    body = {"url": url}
+    if images.enabled() and images.schedule(lambda: make_variants(filename)):
+        body["variants"] = variant_urls(filename)
+        body["variants_pending"] = True
+    return body
+
+
+@router.post("/uploads", openapi_extra=_FORM_SCHEMA)
+async def upload_file(request: Request):
+    """이미지 한 장(multipart 필드 ``file``)을 스트리밍으로 저장하고 URL 반환.
+
+    ``variants``(thumb/medium WebP)는 응답 후 백그라운드에서 만들어지므로
+    잠시 동안은 아직 없을 수 있음 — 그동안은 ``url``을 사용."""
+    try:
+        upload = await read_image(request)
+        _assert_valid_extension(_normalize_extension(upload.filename))
+        filename = f"{uuid.uuid4().hex}{upload.ext}"
+        url = await _store(upload, filename)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="File too large")
+    except NotAnImage:
+        raise HTTPException(status_code=400, detail="Only image files are allowed")
+    except BadForm as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return _uploaded(filename, url)
+
+
+class PresignIn(BaseModel):
+    content_type: str
+    size: int = Field(..., gt=0)
+
+
+class ConfirmIn(BaseModel):
+    token: str
 
-        url = f"{PUBLIC_PREFIX.rstrip('/')}/{filename}"
-        return {"url": url}
+
+def _slot_token(filename: str, content_type: str, size: int) -> str:
+    # no "sub": never usable as an access token
+    exp = int(time.time()) + PRESIGN_TTL + CONFIRM_GRACE
+    claims = {"upload": filename, "ct": content_type, "size": size, "exp": exp}
+    return jwt.encode(claims, security.SECRET_KEY, algorithm=security.ALGORITHM)
+
+
+def _read_slot_token(token: str) -> dict:
+    try:
+        claims = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+    if not isinstance(claims.get("upload"), str) or not filename_for(_public_url(claims["upload"])):
+        raise HTTPException(status_code=400, detail="Invalid or expired upload token")
+    return claims
+
+
+@router.post("/uploads/presign")
+async def presign_upload(payload: PresignIn):
+    """직접 업로드 1단계(s3/supabase): 스토리지에 바로 올릴 서명된 업로드 정보 발급.
+
+    클라이언트는 ``upload``대로(POST 폼 필드 + ``file``, 또는 PUT) 올린 뒤
+    ``token``으로 ``/uploads/confirm``을 호출. local 저장소에서는 404 —
+    그때는 ``POST /uploads`` 사용."""
+    if not DIRECT_UPLOADS:
+        raise HTTPException(status_code=404, detail="Direct uploads are not available; use POST /api/uploads")
+    content_type = payload.content_type.strip().lower()
+    ext = EXTENSIONS.get(content_type)
+    if ext is None:
+        raise HTTPException(status_code=400, detail="Only image files are allowed")
+    if payload.size > MAX_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+    filename = f"{uuid.uuid4().hex}{ext}"
+    return {
+        "upload": await _presign(filename, content_type, payload.size),
+        "token": _slot_token(filename, content_type, payload.size),
+        "expires_in": PRESIGN_TTL,
+    }
+
+
+@router.post("/uploads/confirm")
+async def confirm_upload(payload: ConfirmIn):
+    """직접 업로드 2단계: 비공개 pending 객체의 크기·Content-Type·이미지
+    시그니처를 확인한 뒤 공개 경로로 옮김.
+
+    맞지 않으면 객체를 지우고 400. 성공 시 ``POST /uploads``와 같은 응답
+    (공개 ``url``은 여기서만 나옴)."""
+    if not DIRECT_UPLOADS:
+        raise HTTPException(status_code=404, detail="Direct uploads are not available; use POST /api/uploads")
+    slot = _read_slot_token(payload.token)
+    filename = slot["upload"]
+    found = await _stat(filename, pending=True)
+    if found is None:
+        # a retried confirm whose first attempt already published it
+        if await _stat(filename, pending=False) is not None:
+            return _uploaded(filename, _public_url(filename))
+        raise HTTPException(status_code=404, detail="Upload not found")
+    size, content_type, head = found
+    content_type = content_type.split(";")[0].strip().lower()
+    sniffed = sniff_image(head)
+    if size != slot.get("size") or content_type != slot.get("ct") or sniffed is None or sniffed[1] != slot.get("ct"):
+        await _discard(filename)
+        raise HTTPException(status_code=400, detail="Uploaded file does not match the requested upload")
+    await _publish(filename, slot["ct"])
+    return _uploaded(filename, _public_url(filename))
+
+
+async def sweep_pending(now: Optional[float] = None) -> int:
+    """Delete direct uploads whose slot token expired without a confirm."""
+    cutoff = (time.time() if now is None else now) - PRESIGN_TTL - CONFIRM_GRACE
+    stale = [name for name in await _pending_before(cutoff) if name and "/" not in name]
+    for name in stale:
+        await _discard(name)
+    return len(stale)
+
+
+_sweeper: Optional[asyncio.Task] = None
+
+
+async def _sweep_loop() -> None:
+    while True:
+        await asyncio.sleep(PENDING_SWEEP_EVERY * random.uniform(0.8, 1.2))
+        try:
+            removed = await sweep_pending()
+            if removed:
+                print(f"[UPLOADS] removed {removed} unconfirmed uploads")
+        except Exception as exc:
+            print("WARN pending upload sweep failed:", exc)
+
+
+def start_sweeper() -> None:
+    """Start the pending-upload sweep. Call from startup."""
+    global _sweeper
+    if DIRECT_UPLOADS and PENDING_SWEEP_EVERY > 0 and _sweeper is None:
+        _sweeper = asyncio.get_running_loop().create_task(_sweep_loop())
+
+
+async def stop_sweeper() -> None:
+    """Stop the pending-upload sweep. Call from shutdown."""
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        try:
+            await _sweeper
+        except asyncio.CancelledError:
+            pass
+        _sweeper = None
@@ -0,0 +1,56 @@
+"""Idempotent, additive schema upgrades run at startup.
+
+``create_all()`` only creates missing tables, so columns and indexes added
+after a table first shipped are applied here.
+"""
+from sqlalchemy import text
+
+from . import counters, models, search  # models: registers metadata before create_all
+from .database import Base, SessionLocal, engine, ensure_columns, schema_lock
+
+
+def upgrade_schema() -> None:
+    # Every gunicorn worker runs this at import (no --preload): the lock lets
+    # one do the work while the others wait and then find nothing to do.
+    with schema_lock():
+        _upgrade()
+
+
+def _upgrade() -> None:
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        counters.seed(db)
+    finally:
+        db.close()
+
+    # denormalized comment stats: backfill once when the columns appear
+    if "comment_count" in ensure_columns("neighbor_posts", {
+        "comment_count": "INTEGER NOT NULL DEFAULT 0",
+        "last_commented_at": "TIMESTAMP",
+    }):
+        with engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE neighbor_posts SET "
+                "comment_count = (SELECT COUNT(*) FROM neighbor_comments c WHERE c.post_id = neighbor_posts.id), "
+                "last_commented_at = (SELECT MAX(c.created_at) FROM neighbor_comments c WHERE c.post_id = neighbor_posts.id)"
+            ))
+
+    # excerpt/word_count/primary_image: fill old rows with scripts/backfill_post_fields.py
+    ensure_columns("neighbor_posts", {
+        "excerpt": "VARCHAR",
+        "word_count": "INTEGER NOT NULL DEFAULT 0",
+        "primary_image": "VARCHAR",
+    })
+
+    for index in models.NeighborComment.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+    # full-text index over neighbor posts; fill it once when first created
+    if search.ensure_index(engine):
+        db = SessionLocal()
+        try:
+            print(f"[SEARCH] indexed {search.reindex_all(db)} posts")
+        finally:
+            db.close()
@@ -49,10 +49,25 @@ class PostSummary(BaseModel):
     title: str
     cover: Optional[str] = None
     date: datetime
+    comment_count: int = 0
+    last_commented_at: Optional[datetime] = None
+    excerpt: Optional[str] = None
+    word_count: int = 0
+    primary_image: Optional[str] = None
+    cover_thumb: Optional[str] = None  # small WebP of cover, once rendered
 
     class Config:
         from_attributes = True
 
+class PostSearchHit(PostSummary):
+    snippet: str
+    score: float
+
+
+class PostSearchPage(BaseModel):
+    items: List[PostSearchHit]
+    next_offset: Optional[int] = None
+
 class CommentOut(BaseModel):
     id: int
     post_id: int
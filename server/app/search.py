@@ -0,0 +1,225 @@
+"""Full-text index over neighbor posts.
+
+Text is HTML-stripped and split into tokens: Latin/digit words stay whole,
+Hangul/CJK runs become overlapping bigrams ("서울여행" -> 서울 울여 여행), so a
+two-syllable Korean query still hits the index. The same token string feeds
+both backends:
+
+- SQLite: an FTS5 table ranked with bm25()
+- Postgres: a tsvector('simple') column behind a GIN index, ranked with ts_rank()
+
+Queries become phrase queries over the same bigrams. Snippets are cut from the
+stored plain text in Python, so both backends highlight the same way.
+"""
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import models
+from .content import html_to_text
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CJK_RE = re.compile(r"[ᄀ-ᇿ㄰-㆏가-힣぀-ヿ一-鿿]")
+
+_SNIPPET_RADIUS = 60
+
+_FTS_TABLE = "neighbor_posts_fts"
+_PG_TABLE = "neighbor_post_search"
+
+
+def _word_tokens(word: str) -> list[str]:
+    if len(word) < 2 or not _CJK_RE.search(word):
+        return [word]
+    return [word[i:i + 2] for i in range(len(word) - 1)]
+
+
+def tokenize(value: str) -> str:
+    """Space-joined index tokens for ``value`` (already plain text)."""
+    out: list[str] = []
+    for word in _WORD_RE.findall(value.lower()):
+        out.extend(_word_tokens(word))
+    return " ".join(out)
+
+
+def _query_groups(q: str) -> list[list[str]]:
+    """One token group per query word; each group must match as a phrase."""
+    return [_word_tokens(w) for w in _WORD_RE.findall(q.lower())]
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+def ensure_index(engine: Engine) -> bool:
+    """Create the index structures if missing. Returns True when newly created.
+
+    Run through ``upgrade_schema()``, which holds ``database.schema_lock()``
+    so only one worker creates (and then fills) the index."""
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": _FTS_TABLE}
+            ).first()
+            if exists:
+                return False
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {_FTS_TABLE} USING fts5("
+                " title UNINDEXED, body UNINDEXED, title_tokens, body_tokens,"
+                " tokenize = 'unicode61 remove_diacritics 0')"
+            ))
+            return True
+        if dialect == "postgresql":
+            exists = conn.execute(text("SELECT to_regclass(:n)"), {"n": _PG_TABLE}).scalar()
+            if exists:
+                return False
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {_PG_TABLE} ("
+                " post_id INTEGER PRIMARY KEY REFERENCES neighbor_posts(id) ON DELETE CASCADE,"
+                " title TEXT NOT NULL, body TEXT NOT NULL, tsv TSVECTOR NOT NULL)"
+            ))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{_PG_TABLE}_tsv ON {_PG_TABLE} USING GIN (tsv)"))
+            return True
+    return False
+
+
+def index_post(db: Session, post: models.NeighborPost) -> None:
+    """(Re)index ``post`` inside the caller's transaction."""
+    body = html_to_text(post.content_html)
+    title = post.title or ""
+    params = {
+        "id": post.id,
+        "title": title,
+        "body": body,
+        "tt": tokenize(title),
+        "bt": tokenize(body),
+    }
+    dialect = _dialect(db.get_bind())
+    if dialect == "sqlite":
+        db.execute(text(f"DELETE FROM {_FTS_TABLE} WHERE rowid = :id"), params)
+        db.execute(text(
+            f"INSERT INTO {_FTS_TABLE}(rowid, title, body, title_tokens, body_tokens)"
+            " VALUES (:id, :title, :body, :tt, :bt)"
+        ), params)
+    elif dialect == "postgresql":
+        db.execute(text(
+            f"INSERT INTO {_PG_TABLE}(post_id, title, body, tsv) VALUES (:id, :title, :body,"
+            " setweight(to_tsvector('simple', :tt), 'A') || setweight(to_tsvector('simple', :bt), 'B'))"
+            " ON CONFLICT (post_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, tsv = EXCLUDED.tsv"
+        ), params)
+
+
+def remove_post(db: Session, post_id: int) -> None:
+    dialect = _dialect(db.get_bind())
+    if dialect == "sqlite":
+        db.execute(text(f"DELETE FROM {_FTS_TABLE} WHERE rowid = :id"), {"id": post_id})
+    elif dialect == "postgresql":
+        db.execute(text(f"DELETE FROM {_PG_TABLE} WHERE post_id = :id"), {"id": post_id})
+
+
+def reindex_all(db: Session, batch: int = 500) -> int:
+    """Index every post; used when the index is first created."""
+    done = 0
+    last_id = 0
+    while True:
+        posts: Iterable[models.NeighborPost] = (
+            db.query(models.NeighborPost)
+            .filter(models.NeighborPost.id > last_id)
+            .order_by(models.NeighborPost.id.asc())
+            .limit(batch)
+            .all()
+        )
+        if not posts:
+            break
+        for post in posts:
+            index_post(db, post)
+            last_id = post.id
+            done += 1
+        db.commit()
+    return done
+
+
+@dataclass
+class Hit:
+    post_id: int
+    score: float
+    snippet: str
+
+
+def _fts5_match(groups: list[list[str]]) -> str:
+    parts = []
+    for toks in groups:
+        if len(toks) == 1 and len(toks[0]) == 1:
+            parts.append(f'"{toks[0]}"*')  # single syllable: prefix of a bigram
+        else:
+            parts.append('"' + " ".join(toks) + '"')
+    return " AND ".join(parts)
+
+
+def _pg_tsquery(groups: list[list[str]]) -> str:
+    parts = []
+    for toks in groups:
+        if len(toks) == 1 and len(toks[0]) == 1:
+            parts.append(f"{toks[0]}:*")
+        else:
+            parts.append("(" + " <-> ".join(toks) + ")")
+    return " & ".join(parts)
+
+
+def highlight(body: str, q: str) -> str:
+    """HTML-escaped excerpt around the first match with query words in <mark>."""
+    words = sorted({w for w in _WORD_RE.findall(q.lower())}, key=len, reverse=True)
+    if not body:
+        return ""
+    lower = body.lower()
+    positions = [p for p in (lower.find(w) for w in words) if p >= 0]
+    start = max(0, min(positions) - _SNIPPET_RADIUS) if positions else 0
+    end = min(len(body), start + _SNIPPET_RADIUS * 2 + 40)
+    window = body[start:end]
+    if not words:
+        return html.escape(window)
+    pattern = re.compile("|".join(re.escape(w) for w in words), re.IGNORECASE)
+    out, pos = [], 0
+    for m in pattern.finditer(window):
+        out.append(html.escape(window[pos:m.start()]))
+        out.append(f"<mark>{html.escape(m.group(0))}</mark>")
+        pos = m.end()
+    out.append(html.escape(window[pos:]))
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(body) else ""
+    return prefix + "".join(out) + suffix
+
+
+def search(db: Session, q: str, limit: int, offset: int) -> list[Hit]:
+    """Ranked hits for ``q``; fetch ``limit + 1`` to detect a next page."""
+    groups = _query_groups(q)
+    if not groups:
+        return []
+    dialect = _dialect(db.get_bind())
+    params = {"limit": limit, "offset": offset}
+    if dialect == "sqlite":
+        params["match"] = _fts5_match(groups)
+        rows = db.execute(text(
+            f"SELECT rowid, bm25({_FTS_TABLE}, 0, 0, 3.0, 1.0) AS score, body"
+            f" FROM {_FTS_TABLE} WHERE {_FTS_TABLE} MATCH :match"
+            " ORDER BY score LIMIT :limit OFFSET :offset"
+        ), params).all()
+        # bm25() is lower-is-better; expose higher-is-better like ts_rank
+        return [Hit(r[0], -float(r[1]), highlight(r[2], q)) for r in rows]
+    if dialect == "postgresql":
+        params["query"] = _pg_tsquery(groups)
+        rows = db.execute(text(
+            f"SELECT post_id, ts_rank(tsv, to_tsquery('simple', :query)) AS score, body"
+            f" FROM {_PG_TABLE} WHERE tsv @@ to_tsquery('simple', :query)"
+            " ORDER BY score DESC, post_id DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+        return [Hit(r[0], float(r[1]), highlight(r[2], q)) for r in rows]
+    return []
+
@@ -1,5 +1,9 @@
+import asyncio
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional
 
 from jose import jwt
 from passlib.context import CryptContext
@@ -9,7 +13,28 @@ SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost (log2 rounds). Hashes at any other cost are flagged by
+# needs_update and rehashed on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# Hashing runs in a small process pool so a login burst can't starve the
+# event loop / threadpool. PASSWORD_HASH_WORKERS=0 hashes in a thread instead.
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# jobs running + waiting per API worker; beyond this callers get HasherBusy
+HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+
+class HasherBusy(Exception):
+    """The password hashing queue is full; retry after ``HASH_RETRY_AFTER`` s."""
 
 
 def hash_password(pw: str) -> str:
@@ -20,6 +45,60 @@ def verify_password(pw: str, hashed: str) -> bool:
     return pwd_context.verify(pw, hashed)
 
 
+def verify_and_update(pw: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """(matches, new hash if ``hashed`` is not at the current cost)."""
+    return pwd_context.verify_and_update(pw, hashed)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_inflight = 0
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if HASH_WORKERS <= 0:
+        return None
+    if _pool is None:
+        # spawn: never fork a process that already runs an event loop/threads
+        _pool = ProcessPoolExecutor(
+            max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+async def _offload(fn, *args):
+    global _inflight
+    if _inflight >= HASH_QUEUE_LIMIT:
+        raise HasherBusy()
+    _inflight += 1
+    try:
+        pool = _get_pool()
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+    finally:
+        _inflight -= 1
+
+
+async def hash_password_async(pw: str) -> str:
+    return await _offload(hash_password, pw)
+
+
+async def verify_and_update_async(pw: str, hashed: str) -> tuple[bool, Optional[str]]:
+    return await _offload(verify_and_update, pw, hashed)
+
+
+def hasher_stats() -> dict:
+    return {"workers": HASH_WORKERS, "inflight": _inflight, "queue_limit": HASH_QUEUE_LIMIT, "rounds": BCRYPT_ROUNDS}
+
+
+def shutdown_hasher() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
 def create_access_token(sub: str) -> str:
     expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     exp = datetime.utcnow() + expires_delta
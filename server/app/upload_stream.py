@@ -0,0 +1,208 @@
+"""Streaming reader for single-image ``multipart/form-data`` uploads.
+
+Starlette's ``UploadFile`` spools the whole form before the handler runs.
+``read_image`` instead parses the request body as it arrives: an oversized
+``Content-Length`` is refused before anything is read, the file part is
+checked against image magic bytes on its first chunk, and its data is then
+handed out chunk by chunk, so storage backends can stream it on while the
+byte limit is enforced as it goes.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+MAX_BYTES = int(os.getenv("UPLOADS_MAX_BYTES", str(10 * 1024 * 1024)))
+_FORM_OVERHEAD = 16 * 1024  # boundaries, part headers, other small fields
+SNIFF_BYTES = 16  # enough for every signature below
+
+# (ext, content type) by leading bytes
+_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", ".png", "image/png"),
+    (b"GIF87a", ".gif", "image/gif"),
+    (b"GIF89a", ".gif", "image/gif"),
+    (b"BM", ".bmp", "image/bmp"),
+)
+# content type -> stored extension, for uploads that don't pass through here
+EXTENSIONS = {content_type: ext for _, ext, content_type in _SIGNATURES}
+EXTENSIONS["image/webp"] = ".webp"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class NotAnImage(Exception):
+    pass
+
+
+class BadForm(Exception):
+    pass
+
+
+def sniff_image(head: bytes) -> Optional[tuple[str, str]]:
+    """(ext, content type) of an image by its first bytes, None otherwise."""
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp", "image/webp"
+    for magic, ext, content_type in _SIGNATURES:
+        if head.startswith(magic):
+            return ext, content_type
+    return None
+
+
+@dataclass
+class ImageUpload:
+    filename: Optional[str]   # as sent by the client
+    ext: str                  # from the magic bytes
+    content_type: str         # from the magic bytes
+    _head: bytes
+    _rest: AsyncIterator[bytes]
+    size: int = field(default=0, init=False)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The file data, head included; raises UploadTooLarge mid-stream."""
+        self.size = len(self._head)
+        if self._head:
+            yield self._head
+        async for chunk in self._rest:
+            self.size += len(chunk)
+            yield chunk
+
+
+class _FileParts:
+    """Feeds the body to python-multipart and yields events for ``field``."""
+
+    def __init__(self, request: Request, field: str, max_bytes: int) -> None:
+        self.request = request
+        self.field = field
+        self.max_bytes = max_bytes
+        self._events: list[tuple[str, object]] = []
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+        self._in_file = False
+        self._file_bytes = 0
+
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise BadForm("multipart/form-data with a boundary is required")
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_file = options.get(b"name") == self.field.encode() and b"filename" in options
+        if self._in_file:
+            filename = options[b"filename"].decode("utf-8", "replace")
+            self._events.append(("file", filename))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._file_bytes += end - start
+            if self._file_bytes > self.max_bytes:
+                raise UploadTooLarge()
+            self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._events.append(("end", None))
+        self._in_file = False
+
+    async def events(self) -> AsyncIterator[tuple[str, object]]:
+        received = 0
+        async for chunk in self.request.stream():
+            received += len(chunk)
+            if received > self.max_bytes + _FORM_OVERHEAD:
+                raise UploadTooLarge()
+            try:
+                self._parser.write(chunk)
+            except MultipartParseError as exc:
+                raise BadForm(f"malformed multipart body: {exc}") from exc
+            events, self._events = self._events, []
+            for event in events:
+                yield event
+        try:
+            self._parser.finalize()
+        except MultipartParseError as exc:
+            raise BadForm(f"malformed multipart body: {exc}") from exc
+        for event in self._events:
+            yield event
+
+
+async def read_image(request: Request, field: str = "file", max_bytes: int = MAX_BYTES) -> ImageUpload:
+    """Parse up to the first bytes of ``field`` and check they are an image.
+
+    Raises UploadTooLarge (before reading when Content-Length says so),
+    NotAnImage or BadForm. The rest of the file is read as the returned
+    upload's ``chunks()`` are consumed.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + _FORM_OVERHEAD:
+        raise UploadTooLarge()
+
+    events = _FileParts(request, field, max_bytes).events()
+    filename: Optional[str] = None
+    head = b""
+    ended = False
+    async for kind, value in events:
+        if kind == "file":
+            filename = value
+        elif kind == "data":
+            head += value
+            if len(head) >= SNIFF_BYTES:
+                break
+        elif kind == "end" and filename is not None:
+            ended = True
+            break
+    else:
+        if filename is not None:
+            raise BadForm("body ended inside the file part")
+    if filename is None:
+        raise BadForm(f"missing file field '{field}'")
+    sniffed = sniff_image(head)
+    if sniffed is None:
+        raise NotAnImage()
+
+    async def rest() -> AsyncIterator[bytes]:
+        if ended:
+            return
+        async for kind, value in events:
+            if kind == "data":
+                yield value
+            elif kind == "end":
+                break
+        else:
+            # no closing boundary: a cut-off upload, never store it
+            raise BadForm("body ended inside the file part")
+        # drain whatever follows the file part (limit still applies)
+        async for _ in events:
+            pass
+
+    return ImageUpload(filename, sniffed[0], sniffed[1], head, rest())
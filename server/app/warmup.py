@@ -0,0 +1,137 @@
+"""Startup warm-up registry.
+
+Routers register warmers next to the caches they fill::
+
+    @warmup.register("kopis.perform", priority=50, budget=8.0)
+    async def _warm_perform(): ...
+
+On startup the cache snapshot is restored first, then warmers run in a
+background task (lower priority first, equal priorities concurrently), each
+bounded by its own time budget. Readiness never waits for them; ``status()``
+reports progress for ``/api/ready``. A failing or slow warmer is recorded and
+logged, never raised.
+
+``WARMUP_ENABLED=0`` turns the warmers off (the snapshot is still restored).
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+import time
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from . import cache
+
+WarmFn = Callable[[], Union[Any, Awaitable[Any]]]
+
+
+@dataclass
+class Warmer:
+    name: str
+    fn: WarmFn
+    priority: int = 100
+    budget: float = 5.0
+    state: str = "pending"  # pending | running | done | failed | timeout | skipped
+    error: Optional[str] = None
+    elapsed: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "priority": self.priority,
+            "budget_s": self.budget,
+            "state": self.state,
+            "elapsed_ms": round(self.elapsed * 1000, 1) if self.elapsed is not None else None,
+            "error": self.error,
+        }
+
+
+_warmers: dict[str, Warmer] = {}
+_started_at: Optional[float] = None
+_finished_at: Optional[float] = None
+_restored = 0
+_task: Optional[asyncio.Task] = None
+
+
+def register(name: str, *, priority: int = 100, budget: float = 5.0) -> Callable[[WarmFn], WarmFn]:
+    """Register ``fn`` as warmer ``name``. Sync warmers run in a worker thread.
+
+    The budget caps how long startup waits on the warmer; a sync warmer that
+    overruns keeps its thread until it returns, but is reported as timed out.
+    """
+    def deco(fn: WarmFn) -> WarmFn:
+        _warmers[name] = Warmer(name, fn, priority, budget)
+        return fn
+    return deco
+
+
+def _enabled() -> bool:
+    return os.getenv("WARMUP_ENABLED", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+async def _run_one(w: Warmer) -> None:
+    w.state = "running"
+    t0 = time.perf_counter()
+    try:
+        if inspect.iscoroutinefunction(w.fn):
+            await asyncio.wait_for(w.fn(), timeout=w.budget)
+        else:
+            await asyncio.wait_for(asyncio.to_thread(w.fn), timeout=w.budget)
+        w.state = "done"
+    except asyncio.TimeoutError:
+        w.state = "timeout"
+        print(f"WARN warmup[{w.name}] exceeded its {w.budget:.1f}s budget")
+    except Exception as exc:
+        w.state = "failed"
+        w.error = f"{type(exc).__name__}: {exc}"
+        print(f"WARN warmup[{w.name}] failed:", w.error)
+    finally:
+        w.elapsed = time.perf_counter() - t0
+
+
+async def run_all() -> None:
+    global _finished_at
+    ordered = sorted(_warmers.values(), key=lambda w: w.priority)
+    for _, group in groupby(ordered, key=lambda w: w.priority):
+        await asyncio.gather(*(_run_one(w) for w in group))
+    _finished_at = time.time()
+
+
+def start() -> None:
+    """Restore the cache snapshot, then warm in the background. Call from startup."""
+    global _started_at, _restored, _task, _finished_at
+    _started_at = time.time()
+    _restored = cache.restore()
+    if not _enabled():
+        for w in _warmers.values():
+            w.state = "skipped"
+        _finished_at = time.time()
+        return
+    _task = asyncio.get_running_loop().create_task(run_all())
+
+
+async def stop() -> None:
+    """Cancel unfinished warming and snapshot the caches. Call from shutdown."""
+    if _task is not None and not _task.done():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    written = await asyncio.to_thread(cache.snapshot)
+    print(f"cache snapshot: {written} entries")
+
+
+def status() -> dict:
+    finished = sum(1 for w in _warmers.values() if w.state not in {"pending", "running"})
+    return {
+        "warm": _finished_at is not None,
+        "started_at": _started_at,
+        "finished_at": _finished_at,
+        "restored_entries": _restored,
+        "progress": f"{finished}/{len(_warmers)}",
+        "warmers": [w.as_dict() for w in sorted(_warmers.values(), key=lambda w: (w.priority, w.name))],
+    }
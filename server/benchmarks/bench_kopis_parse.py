@@ -0,0 +1,83 @@
+"""Parse time and cached-entry memory for a KOPIS list page.
+
+before: xmltodict.parse of the whole body; the OrderedDict tree is cached
+after:  kopis_parser.parse_performances (iterparse); compact rows are cached
+
+Memory is what one cached entry keeps alive in the L1 (tracemalloc, peak
+during parse reported separately), plus its encoded size in the shared L2.
+
+Usage (from server/):
+    python -m benchmarks.bench_kopis_parse [--rows 200] [--iterations 200]
+"""
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import orjson
+import xmltodict
+
+from app import kopis_parser
+
+
+def _body(n: int) -> bytes:
+    # shape of http://www.kopis.or.kr/openApi/restful/pblprfr
+    db = (
+        "<db><mt20id>PF{i:06d}</mt20id><prfnm>뮤지컬 〈문학 기행 {i}〉</prfnm>"
+        "<prfpdfrom>2025.01.{d:02d}</prfpdfrom><prfpdto>2025.03.{d:02d}</prfpdto>"
+        "<fcltynm>예술의전당 [서울] (오페라극장 {i})</fcltynm>"
+        "<poster>http://www.kopis.or.kr/upload/pfmPoster/PF_PF{i:06d}_250101_120000.gif</poster>"
+        "<area>서울특별시</area><genrenm>뮤지컬</genrenm><openrun>N</openrun>"
+        "<prfstate>공연중</prfstate></db>"
+    )
+    rows = "".join(db.format(i=i, d=i % 28 + 1) for i in range(n))
+    return f'<?xml version="1.0" encoding="UTF-8"?><dbs>{rows}</dbs>'.encode()
+
+
+def _cpu_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def _retained(fn) -> tuple[object, int, int]:
+    """(result, bytes still allocated after fn, peak bytes during fn)."""
+    tracemalloc.start()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    body = _body(args.rows)
+    tree = xmltodict.parse(body)
+    records = kopis_parser.parse_performances(body)
+    # same fields either way
+    assert kopis_parser.as_dicts(records) == [dict(d) for d in tree["dbs"]["db"]]
+
+    before_cpu = _cpu_per_call(lambda: xmltodict.parse(body), args.iterations)
+    after_cpu = _cpu_per_call(lambda: [tuple(r) for r in kopis_parser.parse_performances(body)], args.iterations)
+
+    _, before_mem, before_peak = _retained(lambda: xmltodict.parse(body))
+    _, after_mem, after_peak = _retained(lambda: [tuple(r) for r in kopis_parser.parse_performances(body)])
+
+    before_l2 = len(orjson.dumps(tree))
+    after_l2 = len(orjson.dumps([tuple(r) for r in records]))
+
+    print(f"rows={args.rows} body={len(body) / 1024:.1f} KiB iterations={args.iterations}")
+    print(f"parse   before (xmltodict):  {before_cpu * 1e3:7.2f} ms CPU   after (iterparse): {after_cpu * 1e3:7.2f} ms CPU   ({before_cpu / after_cpu:.1f}x)")
+    print(f"L1 entry before:             {before_mem / 1024:7.1f} KiB       after:             {after_mem / 1024:7.1f} KiB       ({before_mem / after_mem:.1f}x)")
+    print(f"parse peak before:           {before_peak / 1024:7.1f} KiB       after:             {after_peak / 1024:7.1f} KiB")
+    print(f"L2 entry before:             {before_l2 / 1024:7.1f} KiB       after:             {after_l2 / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
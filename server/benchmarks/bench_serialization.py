@@ -0,0 +1,91 @@
+"""Per-request CPU for serializing the 100-row neighbor summary.
+
+before: PostSummary model per row -> FastAPI response_model validation and
+        JSON-mode serialization -> json.dumps (the default JSONResponse path)
+after:  plain dicts from row tuples -> FastJSONResponse (orjson)
+
+Usage (from server/):
+    python -m benchmarks.bench_serialization [--rows 100] [--iterations 2000]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.utils import create_response_field
+
+from app import schemas
+from app.responses import FastJSONResponse
+
+
+def _tuples(n: int) -> list[tuple]:
+    base = datetime(2025, 1, 1, 9, 30)
+    return [
+        (
+            i, f"작가{i % 17}", f"문학 여행 기록 {i}", f"/static/uploads/{i:032x}.jpg",
+            base + timedelta(minutes=i), i % 7, base + timedelta(hours=i),
+            "청계천을 따라 걸으며 소설 속 장면을 떠올렸다. " * 3, 120 + i, f"/static/uploads/{i:032x}.jpg",
+        )
+        for i in range(n)
+    ]
+
+
+def _before(rows: list[tuple], field) -> bytes:
+    models = [
+        schemas.PostSummary(
+            id=r[0], author=r[1], title=r[2], cover=r[3], date=r[4], comment_count=r[5],
+            last_commented_at=r[6], excerpt=r[7], word_count=r[8], primary_image=r[9],
+        )
+        for r in rows
+    ]
+    # what fastapi.routing.serialize_response does for a response_model
+    value, errors = field.validate(models, {}, loc=("response",))
+    assert not errors
+    return JSONResponse(field.serialize(value, by_alias=True)).body
+
+
+def _after(rows: list[tuple]) -> bytes:
+    out = [
+        {
+            "id": r[0], "author": r[1], "title": r[2], "cover": r[3], "date": r[4],
+            "comment_count": r[5], "last_commented_at": r[6], "excerpt": r[7],
+            "word_count": r[8], "primary_image": r[9],
+        }
+        for r in rows
+    ]
+    return FastJSONResponse(out).body
+
+
+def _cpu_per_call(fn, iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    rows = _tuples(args.rows)
+    field = create_response_field(name="Response_summary", type_=List[schemas.PostSummary])
+
+    # same JSON document either way (modulo whitespace)
+    assert json.loads(_before(rows, field)) == json.loads(_after(rows))
+
+    before = _cpu_per_call(lambda: _before(rows, field), args.iterations)
+    after = _cpu_per_call(lambda: _after(rows), args.iterations)
+    print(f"rows={args.rows} iterations={args.iterations}")
+    print(f"before (pydantic + response_model + json.dumps): {before * 1e6:9.1f} µs CPU/request")
+    print(f"after  (row tuples + orjson):                    {after * 1e6:9.1f} µs CPU/request")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()